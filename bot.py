@@ -6,22 +6,33 @@ import discord
 from discord.ext import commands
 import gspread
 import gspread.exceptions as gspread_exceptions
+from gspread.utils import rowcol_to_a1
 from dotenv import load_dotenv
 from oauth2client.service_account import ServiceAccountCredentials
 from datetime import datetime
 from datetime import timedelta
-from collections import defaultdict
+from collections import defaultdict, OrderedDict, deque, Counter
+from itertools import zip_longest
+from bisect import bisect_left, insort
+import heapq
 import os
 from threading import Thread
 from flask import Flask
 import threading, time, requests
 import asyncio
+import random
 import time
 import sys
 import io
 import textwrap
 import traceback
 import contextlib
+import functools
+import weakref
+import sqlite3
+import unicodedata
+from fuzzywuzzy import fuzz
+from concurrent.futures import ThreadPoolExecutor
 
 
 # ----------------- Flask for uptime -----------------
@@ -122,8 +133,62 @@ REPLACEMENTS: Dict[str, str] = {
     "cracker": "pal", "crackers": "pals"
 }
 
-# Keep recent awards in memory: {(giver_id, receiver_id): [(points, datetime), ...]}
-recent_awards = defaultdict(list)
+# Points each giver has awarded each receiver over the last hour, for
+# MAX_POINTS_HOURLY. Points are summed into one-minute buckets, so a busy
+# pair costs at most 60 counters, and pairs with nothing left in the window
+# are evicted, so memory tracks recent activity rather than uptime.
+class AwardLimiter:
+    def __init__(self, limit, window=3600, bucket=60):
+        self.limit = limit
+        self.window = window
+        self.bucket = bucket
+        self.pairs = OrderedDict()  # key -> deque of [bucket_start, points]; least recently used first
+
+    def _expire(self, now):
+        cutoff = now - self.window
+        # idle pairs sit at the front; stop at the first one still in use
+        while self.pairs:
+            key, buckets = next(iter(self.pairs.items()))
+            while buckets and buckets[0][0] + self.bucket <= cutoff:
+                buckets.popleft()
+            if buckets:
+                break
+            del self.pairs[key]
+
+    def used(self, key, now=None):
+        now = time.time() if now is None else now
+        self._expire(now)
+        buckets = self.pairs.get(key, ())
+        cutoff = now - self.window
+        return sum(points for start, points in buckets if start + self.bucket > cutoff)
+
+    def try_acquire(self, key, points, now=None):
+        """Count `points` for `key` if that stays within the limit.
+        Returns (allowed, points already used in the window)."""
+        now = time.time() if now is None else now
+        used = self.used(key, now)
+        if used + points > self.limit:
+            return False, used
+        buckets = self.pairs.setdefault(key, deque())
+        self.pairs.move_to_end(key)
+        start = now - now % self.bucket
+        if buckets and buckets[-1][0] == start:
+            buckets[-1][1] += points
+        else:
+            buckets.append([start, points])
+        return True, used
+
+    def refund(self, key, points):
+        """Give back points from an award that didn't go through."""
+        buckets = self.pairs.get(key)
+        while buckets and points > 0:
+            taken = min(points, buckets[-1][1])
+            buckets[-1][1] -= taken
+            points -= taken
+            if not buckets[-1][1]:
+                buckets.pop()
+
+award_limiter = AwardLimiter(MAX_POINTS_HOURLY)
 
 load_dotenv()
 
@@ -149,70 +214,1167 @@ main_sheet = client.open("__1ST VANGUARD DIVISION MERIT DATA__").sheet1
 
 
 # --- Sheet helpers (single main_sheet only) ---
-# Caches header columns for quicker access.
+# Caches header columns for quicker access. The map is saved in the merit
+# store so a restart doesn't have to search the sheet again; it is checked
+# against the header cells that roster reads bring back anyway, and only
+# searched for again when those don't match or a write lands off the grid.
 _HEADER_CACHE = {}
+HEADER_LABELS = {'name_col': "Name", 'merit_col': "Merits", 'rank_col': "Rank"}
+
+
+# Bump when _name_key changes so the merit store re-keys its rows.
+NAME_KEY_VERSION = 2
+
+@functools.lru_cache(maxsize=8192)
+def _name_key(name):
+    """Canonical roster key for a Roblox name: NFKC-normalized, case-folded,
+    whitespace collapsed. Every roster index stores this form; the cache
+    means each distinct name is normalized once."""
+    return " ".join(unicodedata.normalize("NFKC", name).casefold().split())
+
+
+class TrigramIndex:
+    """Roster names by character trigram. A fuzzy lookup first shortlists
+    the names sharing the most trigrams with the query, and only those are
+    scored with fuzzywuzzy, so a typo doesn't cost a pass over every name."""
+
+    SHORTLIST = 50
+
+    def __init__(self):
+        self.grams = defaultdict(set)  # trigram -> name keys
+        self.names = {}                # name key -> name as written
+
+    @staticmethod
+    def _grams(key):
+        padded = f"  {key} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def rebuild(self, records):
+        self.grams = defaultdict(set)
+        self.names = {}
+        for rec in records:
+            self.add(rec['name'])
+
+    def add(self, name):
+        key = _name_key(name)
+        if key in self.names:
+            return
+        self.names[key] = name
+        for gram in self._grams(key):
+            self.grams[gram].add(key)
+
+    def remove(self, name):
+        key = _name_key(name)
+        if self.names.pop(key, None) is None:
+            return
+        for gram in self._grams(key):
+            self.grams[gram].discard(key)
+            if not self.grams[gram]:
+                del self.grams[gram]
+
+    def suggest(self, query, limit=3, min_score=70):
+        """[(name, score)] of the closest roster names, best first."""
+        key = _name_key(query)
+        shared = Counter(k for gram in self._grams(key) for k in self.grams.get(gram, ()))
+        scored = sorted(((fuzz.ratio(key, k), k) for k, _ in shared.most_common(self.SHORTLIST)), reverse=True)
+        return [(self.names[k], score) for score, k in scored[:limit] if score >= min_score]
+
+
+class LeaderboardIndex:
+    """Roster records kept sorted by merits (highest first, ties by name).
+    Entries are (-merits, name_key, id(rec)) tuples in a bisect-maintained
+    list, so an award moves one entry instead of re-sorting the roster."""
+
+    def __init__(self):
+        self.entries = []
+        self.entry_of = {}  # id(rec) -> its current entry
+        self.recs = {}      # id(rec) -> rec
+        self.by_key = {}    # name_key -> rec
+
+    def __len__(self):
+        return len(self.entries)
+
+    def rebuild(self, records):
+        self.entry_of = {id(rec): (-rec['merits'], _name_key(rec['name']), id(rec)) for rec in records}
+        self.recs = {id(rec): rec for rec in records}
+        self.by_key = {}
+        for rec in records:
+            self.by_key.setdefault(_name_key(rec['name']), rec)
+        self.entries = sorted(self.entry_of.values())
+
+    def add(self, rec):
+        entry = (-rec['merits'], _name_key(rec['name']), id(rec))
+        self.entry_of[id(rec)] = entry
+        self.recs[id(rec)] = rec
+        self.by_key.setdefault(entry[1], rec)
+        insort(self.entries, entry)
+
+    def remove(self, rec):
+        entry = self.entry_of.pop(id(rec), None)
+        if entry is None:
+            return
+        del self.recs[id(rec)]
+        if self.by_key.get(entry[1]) is rec:
+            del self.by_key[entry[1]]
+        i = bisect_left(self.entries, entry)
+        if i < len(self.entries) and self.entries[i] == entry:
+            del self.entries[i]
+
+    def reindex(self, rec):
+        """Move `rec` after its merits or name changed."""
+        self.remove(rec)
+        self.add(rec)
+
+    def get(self, name):
+        return self.by_key.get(_name_key(name))
+
+    def top(self, n, start=0):
+        return [self.recs[e[2]] for e in self.entries[start:start + n]]
+
+    def position(self, rec):
+        """(place, tied) for `rec`: place counts members with more merits
+        (standard competition ranking), tied counts others on the same score."""
+        first = bisect_left(self.entries, (-rec['merits'],))
+        end = bisect_left(self.entries, (-rec['merits'] + 1,))
+        return first + 1, end - first - 1
+
+    def ties(self, merits):
+        """Records on exactly `merits` points, by name."""
+        first = bisect_left(self.entries, (-merits,))
+        end = bisect_left(self.entries, (-merits + 1,))
+        return [self.recs[e[2]] for e in self.entries[first:end]]
+
+
+class RosterCache:
+    """In-memory copy of the merit roster.
+    Reads are served from here until invalidate() is called (after a failed
+    sheet write); writes update the cached record and the merit store, and
+    reach the sheet later through the merit journal. Edits made on the sheet
+    are picked up by the change poller. by_name maps the
+    normalized name to its record so lookups don't scan the roster.
+    A record whose 'row' is None has not been written to the sheet yet.
+    by_row maps sheet rows to records and `rows` keeps the occupied rows
+    sorted, so inserting or deleting sheet rows only renumbers the records
+    below the change instead of forcing a reload. `free` is a min-heap of
+    blank rows inside the roster, so a new member fills the topmost gap
+    without reading the sheet. `leaderboard` keeps the records ranked by
+    merits and is updated by the same hooks; `regiments` holds one such
+    ranking per regiment, for records whose regiment is known. `search`
+    indexes the names for "did you mean" suggestions.
+    `version` goes up on every change so other caches can key on it."""
+
+    def __init__(self):
+        self.records = None
+        self.by_name = {}
+        self.by_row = {}
+        self.rows = []
+        self.free = []
+        self.leaderboard = LeaderboardIndex()
+        self.regiments = {}
+        self.search = TrigramIndex()
+        self.last_row = 0
+        self.loaded_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.version = 0
+
+    def is_fresh(self):
+        # no expiry: a reload would swap in new record dicts under writers
+        # still holding the old ones
+        return self.records is not None
+
+    def load(self, records, last_row, first_row=None):
+        self.records = records
+        self.by_name = {}
+        for rec in records:
+            # first row wins when the sheet holds the same name twice
+            self.by_name.setdefault(_name_key(rec['name']), rec)
+        self.by_row = {rec['row']: rec for rec in records if rec['row'] is not None}
+        self.rows = sorted(self.by_row)
+        # ascending, so already a valid heap
+        self.free = [r for r in range(first_row or last_row + 1, last_row + 1) if r not in self.by_row]
+        self.leaderboard.rebuild(records)
+        self.search.rebuild(records)
+        by_regiment = defaultdict(list)
+        for rec in records:
+            if rec.get('regiment'):
+                by_regiment[rec['regiment']].append(rec)
+        self.regiments = {}
+        for regiment, members in by_regiment.items():
+            self.regiments[regiment] = LeaderboardIndex()
+            self.regiments[regiment].rebuild(members)
+        self.last_row = last_row
+        self.loaded_at = time.monotonic()
+        self.version += 1
+
+    def invalidate(self):
+        self.records = None
+        self.by_name = {}
+        self.by_row = {}
+        self.rows = []
+        self.free = []
+        self.leaderboard = LeaderboardIndex()
+        self.regiments = {}
+        self.search = TrigramIndex()
+        self.version += 1
+
+    def get(self, name):
+        return self.by_name.get(_name_key(name))
+
+    def record_at(self, row):
+        return self.by_row.get(row)
+
+    def add(self, rec):
+        self.records.append(rec)
+        self.by_name.setdefault(_name_key(rec['name']), rec)
+        if rec['row'] is not None:
+            self.place(rec, rec['row'])
+        self.leaderboard.add(rec)
+        self.search.add(rec['name'])
+        if rec.get('regiment'):
+            self.regiments.setdefault(rec['regiment'], LeaderboardIndex()).add(rec)
+        self.version += 1
+
+    def place(self, rec, row):
+        """Record that `rec` now lives on sheet row `row`."""
+        rec['row'] = row
+        self.by_row[row] = rec
+        insort(self.rows, row)
+
+    def unplace(self, rec):
+        """Undo place() for a row that never reached the sheet; the row goes
+        back to the free heap."""
+        row = rec['row']
+        if row is not None and self.by_row.get(row) is rec:
+            del self.by_row[row]
+            self.rows.pop(bisect_left(self.rows, row))
+            heapq.heappush(self.free, row)
+        rec['row'] = None
+        self.version += 1
+
+    def set_regiment(self, rec, regiment):
+        """Move `rec` to `regiment`'s ranking; None (the member left their
+        regiment) takes it off the regiment rankings."""
+        regiment = regiment or None
+        if (rec.get('regiment') or None) == regiment:
+            return False
+        if rec.get('regiment') in self.regiments:
+            self.regiments[rec['regiment']].remove(rec)
+        rec['regiment'] = regiment
+        if regiment:
+            self.regiments.setdefault(regiment, LeaderboardIndex()).add(rec)
+        self.version += 1
+        return True
+
+    def take_free_row(self):
+        """Pop the topmost blank row, or None when the roster has no gaps."""
+        while self.free:
+            row = heapq.heappop(self.free)
+            # entries go stale when a row is filled some other way
+            if row not in self.by_row and row <= self.last_row:
+                return row
+        return None
+
+    def update(self, rec, merits=None, rank=None):
+        """Change a cached record's merits and/or rank."""
+        if merits is not None:
+            rec['merits'] = merits
+            self.leaderboard.reindex(rec)
+            if rec.get('regiment') in self.regiments:
+                self.regiments[rec['regiment']].reindex(rec)
+        if rank is not None:
+            rec['rank'] = rank
+        self.version += 1
+
+    def delete_rows(self, rows):
+        """Drop the records at `rows` and close the gaps, as if the sheet rows
+        were deleted bottom-up. Returns the removed records."""
+        if self.records is None:
+            return []
+        doomed = sorted({r for r in rows if r is not None})
+        if not doomed:
+            return []
+        removed = [self.by_row.pop(r) for r in doomed if r in self.by_row]
+        start = bisect_left(self.rows, doomed[0])
+        survivors = [r for r in self.rows[start:] if r in self.by_row]
+        # each surviving row moves up by the number of deleted rows above it
+        self._renumber(start, [(r, r - bisect_left(doomed, r)) for r in survivors])
+        self.free = [r - bisect_left(doomed, r) for r in self.free if r not in doomed]
+        heapq.heapify(self.free)
+        self.last_row -= len(doomed)
+        self._forget(removed)
+        return removed
+
+    def discard(self, rec):
+        """Drop a record that was never written to the sheet."""
+        if self.records is not None and rec['row'] is None:
+            self._forget([rec])
+
+    def _renumber(self, start, moves):
+        """Apply (old_row, new_row) moves to the records at self.rows[start:]."""
+        moved = [(self.by_row.pop(old), new) for old, new in moves]
+        for rec, new in moved:
+            rec['row'] = new
+            self.by_row[new] = rec
+        self.rows[start:] = [new for _, new in moves]
+
+    def _forget(self, removed):
+        if not removed:
+            return
+        gone = {id(rec) for rec in removed}
+        self.records[:] = [rec for rec in self.records if id(rec) not in gone]
+        self.version += 1
+        for rec in removed:
+            self.leaderboard.remove(rec)
+            if rec.get('regiment') in self.regiments:
+                self.regiments[rec['regiment']].remove(rec)
+            key = _name_key(rec['name'])
+            if self.by_name.get(key) is rec:
+                del self.by_name[key]
+                # fall back to a duplicate row for the same name, if any
+                for other in self.records:
+                    if _name_key(other['name']) == key:
+                        self.by_name[key] = other
+                        break
+                else:
+                    self.search.remove(rec['name'])
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': (self.hits / lookups) if lookups else 0.0,
+            'size': len(self.records) if self.records is not None else 0,
+            'age': (time.monotonic() - self.loaded_at) if self.records is not None else None,
+        }
+
+
+roster_cache = RosterCache()
+
+
+# --- Local merit store (SQLite) ---
+# The bot's primary copy of the roster. Every merit change is committed here
+# first; the Google Sheet is a replica kept up to date by the merit journal
+# flusher, so officers still see their spreadsheet.
+MERIT_DB_PATH = os.getenv("MERIT_DB_PATH", "merits.db")
+
+
+class MeritStore:
+    """SQLite-backed roster table with indexed name and merit columns.
+    Records keep their sheet row so the replica can be written in place."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS roster (
+        id       INTEGER PRIMARY KEY,
+        name     TEXT NOT NULL,
+        name_key TEXT NOT NULL,
+        merits   INTEGER NOT NULL DEFAULT 0,
+        rank     TEXT NOT NULL DEFAULT '',
+        row      INTEGER
+    );
+    CREATE INDEX IF NOT EXISTS roster_name_key ON roster(name_key);
+    CREATE INDEX IF NOT EXISTS roster_merits ON roster(merits DESC);
+    CREATE INDEX IF NOT EXISTS roster_row ON roster(row);
+    CREATE TABLE IF NOT EXISTS meta (
+        key   TEXT PRIMARY KEY,
+        value TEXT
+    );
+    CREATE TABLE IF NOT EXISTS monthly_merits (
+        month    TEXT NOT NULL,
+        name_key TEXT NOT NULL,
+        name     TEXT NOT NULL,
+        points   INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (month, name_key)
+    );
+    """
+
+    def __init__(self, path):
+        self.db = sqlite3.connect(path)
+        self.db.row_factory = sqlite3.Row
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(self.SCHEMA)
+        columns = {r['name'] for r in self.db.execute("PRAGMA table_info(roster)")}
+        if 'regiment' not in columns:
+            # regiments are only known to the bot, not the sheet
+            self.db.execute("ALTER TABLE roster ADD COLUMN regiment TEXT")
+        if self.get_meta('name_key_version') != str(NAME_KEY_VERSION):
+            self._rekey()
+
+    def _rekey(self):
+        """Recompute stored name keys after _name_key changed; monthly
+        totals that now share a key are added together."""
+        with self.db:
+            for r in self.db.execute("SELECT id, name FROM roster").fetchall():
+                self.db.execute("UPDATE roster SET name_key = ? WHERE id = ?", (_name_key(r['name']), r['id']))
+            totals = {}
+            for r in self.db.execute("SELECT month, name, points FROM monthly_merits").fetchall():
+                key = (r['month'], _name_key(r['name']))
+                name, points = totals.get(key, (r['name'], 0))
+                totals[key] = (name, points + r['points'])
+            self.db.execute("DELETE FROM monthly_merits")
+            self.db.executemany(
+                "INSERT INTO monthly_merits (month, name_key, name, points) VALUES (?, ?, ?, ?)",
+                [(month, key, name, points) for (month, key), (name, points) in totals.items()],
+            )
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('name_key_version', ?)", (str(NAME_KEY_VERSION),))
+
+    def get_meta(self, key, default=None):
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else default
+
+    def set_meta(self, key, value):
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def is_empty(self):
+        return self.db.execute("SELECT 1 FROM roster LIMIT 1").fetchone() is None
+
+    def load(self):
+        """Return (records, last_row) in sheet order; unplaced records last."""
+        records = [
+            {'id': r['id'], 'name': r['name'], 'merits': r['merits'], 'rank': r['rank'], 'row': r['row'], 'regiment': r['regiment']}
+            for r in self.db.execute("SELECT * FROM roster ORDER BY row IS NULL, row, id")
+        ]
+        return records, int(self.get_meta('last_row', 0))
+
+    def replace_all(self, records, last_row):
+        """Replace the table with a fresh roster (e.g. after a sheet download).
+        Regiments aren't on the sheet, so they carry over by name."""
+        self.carry_regiments(records)
+        with self.db:
+            self.db.execute("DELETE FROM roster")
+            for rec in records:
+                cur = self.db.execute(
+                    "INSERT INTO roster (name, name_key, merits, rank, row, regiment) VALUES (?, ?, ?, ?, ?, ?)",
+                    (rec['name'], _name_key(rec['name']), rec['merits'], rec['rank'], rec['row'], rec['regiment']),
+                )
+                rec['id'] = cur.lastrowid
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_row', ?)", (str(last_row),))
+
+    def carry_regiments(self, records):
+        """Give records read from the sheet the regiment stored for their name."""
+        regiments = dict(self.db.execute("SELECT name_key, regiment FROM roster WHERE regiment IS NOT NULL").fetchall())
+        for rec in records:
+            if not rec.get('regiment'):
+                rec['regiment'] = regiments.get(_name_key(rec['name']))
+
+    def save(self, rec):
+        """Insert or update one record; assigns rec['id'] on first save."""
+        with self.db:
+            if rec.get('id') is None:
+                cur = self.db.execute(
+                    "INSERT INTO roster (name, name_key, merits, rank, row, regiment) VALUES (?, ?, ?, ?, ?, ?)",
+                    (rec['name'], _name_key(rec['name']), rec['merits'], rec['rank'], rec['row'], rec.get('regiment')),
+                )
+                rec['id'] = cur.lastrowid
+            else:
+                self.db.execute(
+                    "UPDATE roster SET name = ?, name_key = ?, merits = ?, rank = ?, row = ?, regiment = ? WHERE id = ?",
+                    (rec['name'], _name_key(rec['name']), rec['merits'], rec['rank'], rec['row'], rec.get('regiment'), rec['id']),
+                )
+
+    def delete_rows(self, rows, last_row):
+        """Mirror RosterCache.delete_rows: delete bottom-up, closing each gap."""
+        with self.db:
+            for row in sorted(set(rows), reverse=True):
+                self.db.execute("DELETE FROM roster WHERE row = ?", (row,))
+                self.db.execute("UPDATE roster SET row = row - 1 WHERE row > ?", (row,))
+            self.db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('last_row', ?)", (str(last_row),))
+
+    def delete(self, rec):
+        with self.db:
+            self.db.execute("DELETE FROM roster WHERE id = ?", (rec.get('id'),))
+
+    def add_monthly(self, month, name, points):
+        with self.db:
+            self.db.execute(
+                "INSERT INTO monthly_merits (month, name_key, name, points) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (month, name_key) DO UPDATE SET points = points + excluded.points, name = excluded.name",
+                (month, _name_key(name), name, points),
+            )
+
+    def monthly(self, month):
+        return [(r['name'], r['points']) for r in self.db.execute("SELECT name, points FROM monthly_merits WHERE month = ?", (month,))]
+
+
+merit_store = MeritStore(MERIT_DB_PATH)
+_HEADER_CACHE.update(json.loads(merit_store.get_meta('headers') or "{}"))
 
-def _locate_headers(force=False):
+
+class MonthlyTotals:
+    """Merits awarded per member per calendar month ('YYYY-MM'), ranked with
+    a LeaderboardIndex. A month is loaded from the store the first time it
+    is needed and then kept current by add()."""
+
+    def __init__(self, store):
+        self.store = store
+        self.months = {}  # month -> (LeaderboardIndex, {name_key: rec})
+        self.version = 0
+
+    def board(self, month):
+        if month not in self.months:
+            recs = {_name_key(name): {'name': name, 'merits': points} for name, points in self.store.monthly(month)}
+            board = LeaderboardIndex()
+            board.rebuild(list(recs.values()))
+            self.months[month] = (board, recs)
+        return self.months[month][0]
+
+    def add(self, name, points, when=None):
+        month = (when or datetime.utcnow()).strftime("%Y-%m")
+        board = self.board(month)
+        recs = self.months[month][1]
+        rec = recs.get(_name_key(name))
+        if rec is None:
+            rec = recs[_name_key(name)] = {'name': name, 'merits': points}
+            board.add(rec)
+        else:
+            rec['merits'] += points
+            board.reindex(rec)
+        self.store.add_monthly(month, name, points)
+        self.version += 1
+
+monthly_totals = MonthlyTotals(merit_store)
+
+
+# --- Async sheet access ---
+# gspread is blocking, so every Sheets call runs on this pool instead of the
+# event loop; a slow response then can't stall gateway heartbeats. The pool
+# size is the concurrency limit for Sheets requests.
+SHEETS_MAX_WORKERS = int(os.getenv("SHEETS_MAX_WORKERS", "4"))
+_sheets_executor = ThreadPoolExecutor(max_workers=SHEETS_MAX_WORKERS, thread_name_prefix="sheets")
+# Held while row numbers are in flight (inserts, deletes, batched cell writes)
+# so one request can't shift rows under another.
+_sheet_layout_lock = asyncio.Lock()
+# Coalesces concurrent cache misses into a single download.
+_roster_load_lock = asyncio.Lock()
+
+async def _sheet_io(func, *args, **kwargs):
+    """Run a blocking gspread call on the Sheets thread pool and await it."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_sheets_executor, functools.partial(func, *args, **kwargs))
+
+
+# --- Sheets quota ---
+# Google allows a fixed number of read and write requests per minute. Calls
+# take a token from the matching bucket first and wait in line when it is
+# empty, instead of firing and collecting APIError 429. Rate-limit and 5xx
+# responses that still get through are retried with jittered exponential
+# backoff.
+SHEETS_READS_PER_MINUTE = int(os.getenv("SHEETS_READS_PER_MINUTE", "60"))
+SHEETS_WRITES_PER_MINUTE = int(os.getenv("SHEETS_WRITES_PER_MINUTE", "60"))
+SHEETS_MAX_RETRIES = 5
+SHEETS_BACKOFF_BASE = 1.0   # seconds
+SHEETS_BACKOFF_MAX = 32.0   # seconds
+_RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Refills `capacity` tokens evenly over `period` seconds."""
+
+    def __init__(self, capacity, period=60.0):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.waiting = 0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def remaining(self):
+        self._refill()
+        return int(self.tokens)
+
+    async def acquire(self):
+        # the lock makes callers queue in arrival order while the bucket refills
+        self.waiting += 1
+        try:
+            async with self._lock:
+                while True:
+                    self._refill()
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        return
+                    await asyncio.sleep((1 - self.tokens) / self.rate)
+        finally:
+            self.waiting -= 1
+
+
+def _api_error_status(exc):
+    if not isinstance(exc, gspread_exceptions.APIError):
+        return None
+    status = getattr(exc, "code", None)
+    if status is None:
+        status = getattr(getattr(exc, "response", None), "status_code", None)
+    return status
+
+
+class QuotaAwareSheets:
+    """Front door for every gspread request made by the bot."""
+
+    def __init__(self, reads_per_minute, writes_per_minute):
+        self.buckets = {
+            'read': TokenBucket(reads_per_minute),
+            'write': TokenBucket(writes_per_minute),
+        }
+        self.retries = 0
+        self.throttled = 0
+
+    async def read(self, func, *args, **kwargs):
+        return await self._call('read', func, args, kwargs)
+
+    async def write(self, func, *args, idempotent=True, **kwargs):
+        """A write request. Pass idempotent=False for appends and row
+        inserts/deletes: a 5xx may come back after the change was made, so
+        those are retried only on 429, which is rejected before it runs."""
+        retryable = _RETRYABLE_STATUS if idempotent else {429}
+        return await self._call('write', func, args, kwargs, retryable)
+
+    async def _call(self, kind, func, args, kwargs, retryable=_RETRYABLE_STATUS):
+        bucket = self.buckets[kind]
+        for attempt in range(SHEETS_MAX_RETRIES + 1):
+            await bucket.acquire()
+            try:
+                return await _sheet_io(func, *args, **kwargs)
+            except gspread_exceptions.APIError as e:
+                status = _api_error_status(e)
+                if status not in retryable or attempt == SHEETS_MAX_RETRIES:
+                    raise
+                if status == 429:
+                    self.throttled += 1
+                    # the server says we're out; don't trust our own count
+                    bucket.tokens = 0
+                self.retries += 1
+                delay = min(SHEETS_BACKOFF_MAX, SHEETS_BACKOFF_BASE * (2 ** attempt))
+                await asyncio.sleep(random.uniform(0, delay))
+
+    def quota(self):
+        """Remaining request budget per bucket plus retry counters."""
+        return {
+            'read': self.buckets['read'].remaining(),
+            'write': self.buckets['write'].remaining(),
+            'read_waiting': self.buckets['read'].waiting,
+            'write_waiting': self.buckets['write'].waiting,
+            'retries': self.retries,
+            'throttled': self.throttled,
+        }
+
+
+sheets = QuotaAwareSheets(SHEETS_READS_PER_MINUTE, SHEETS_WRITES_PER_MINUTE)
+
+def _store_headers(name_col, merit_col, rank_col, data_start_row):
+    _HEADER_CACHE.update({'name_col':name_col,'merit_col':merit_col,'rank_col':rank_col,'data_start_row':data_start_row})
+    merit_store.set_meta('headers', json.dumps(_HEADER_CACHE))
+    return name_col, merit_col, rank_col, data_start_row
+
+async def _locate_headers(force=False):
     """Locate Name / Merits / Rank headers on the sheet and cache their cols/row.
     Returns (name_col, merit_col, rank_col, data_start_row)
     """
     if _HEADER_CACHE and not force:
         return _HEADER_CACHE['name_col'], _HEADER_CACHE['merit_col'], _HEADER_CACHE['rank_col'], _HEADER_CACHE['data_start_row']
+    # API errors propagate as they are; only a missing header is a RuntimeError
+    name_cell = await sheets.read(main_sheet.find, "Name")
+    merit_cell = await sheets.read(main_sheet.find, "Merits")
+    rank_cell = await sheets.read(main_sheet.find, "Rank")
+    if not (name_cell and merit_cell and rank_cell):
+        raise RuntimeError("Sheet headers 'Name','Merits','Rank' not found")
+    return _store_headers(name_cell.col, merit_cell.col, rank_cell.col, name_cell.row + 1)
+
+def _row_values(name, merits, rank):
+    """Values for a whole new row, placed under the located header columns."""
+    by_col = {
+        _HEADER_CACHE['name_col']: name,
+        _HEADER_CACHE['merit_col']: merits,
+        _HEADER_CACHE['rank_col']: rank,
+    }
+    return [by_col.get(c, "") for c in range(1, max(by_col) + 1)]
+
+def _column_range(col, start_row):
+    """A1 range for one column from start_row to the bottom, e.g. 'B3:B'."""
+    first = rowcol_to_a1(start_row, col)
+    return f"{first}:{first.rstrip('0123456789')}"
+
+async def _fetch_roster_columns():
+    """Read the Name/Merits/Rank columns (header cell included) in one batch_get.
+    The header cells validate the cached header map for free; if they don't
+    match, the headers are searched for again and the read is repeated once.
+    Returns (data_start_row, names, merits, ranks) without the header cells."""
+    for attempt in range(2):
+        name_col, merit_col, rank_col, data_start = await _locate_headers(force=attempt > 0)
+        columns = await sheets.read(
+            main_sheet.batch_get,
+            [_column_range(c, data_start - 1) for c in (name_col, merit_col, rank_col)],
+        )
+        heads = [(col[0][0] if col and col[0] else "").strip() for col in columns]
+        if heads == [HEADER_LABELS['name_col'], HEADER_LABELS['merit_col'], HEADER_LABELS['rank_col']]:
+            return (data_start, *[list(col[1:]) for col in columns])
+    raise RuntimeError("Sheet headers 'Name','Merits','Rank' not found")
+
+def _roster_rows(data_start, names, merits, ranks):
+    """Parse column reads into ({row: (name, merits, rank)}, last_row), skipping blank names."""
+    sheet_rows = {}
+    for offset, (n, m, r) in enumerate(zip_longest(names, merits, ranks, fillvalue=[])):
+        name = (n[0] if n else "").strip()
+        if name:
+            sheet_rows[data_start + offset] = (name, _parse_merits(m[0] if m else "0"), (r[0] if r else "").strip())
+    return sheet_rows, data_start - 1 + max(len(names), len(merits), len(ranks))
+
+async def _get_all_records(force=False):
+    """Return list of dicts: {'id':int,'name':str,'merits':int,'rank':str,'row':int}
+    Served from roster_cache once loaded, else from the local merit
+    store. The sheet is only read when the store is empty or force=True;
+    that reads only the Name/Merits/Rank columns below the headers, ignoring
+    empty name rows, and replaces the store's contents.
+    The returned list is shared with the cache - do not mutate it."""
+    if not force and roster_cache.is_fresh():
+        roster_cache.hits += 1
+        return roster_cache.records
+    async with _roster_load_lock:
+        # another command may have reloaded while we waited
+        if not force and roster_cache.is_fresh():
+            roster_cache.hits += 1
+            return roster_cache.records
+        roster_cache.misses += 1
+        if not force and not merit_store.is_empty():
+            data_start = (await _locate_headers())[3]
+            records, last_row = merit_store.load()
+            roster_cache.load(records, last_row, data_start)
+            return records
+        data_start, names, merits, ranks = await _fetch_roster_columns()
+        sheet_rows, last_row = _roster_rows(data_start, names, merits, ranks)
+        records = [{'name': n, 'merits': m, 'rank': r, 'row': row} for row, (n, m, r) in sorted(sheet_rows.items())]
+        _install_records(records, last_row, data_start)
+        return records
+
+def _parse_merits(value):
+    # parse merits safely
     try:
-        name_cell = main_sheet.find("Name")
-        merit_cell = main_sheet.find("Merits")
-        rank_cell = main_sheet.find("Rank")
+        return int(value or 0)
     except Exception:
-        raise RuntimeError("Sheet headers 'Name','Merits','Rank' not found")
-    name_col, merit_col, rank_col = name_cell.col, merit_cell.col, rank_cell.col
-    data_start_row = name_cell.row + 1
-    _HEADER_CACHE.update({'name_col':name_col,'merit_col':merit_col,'rank_col':rank_col,'data_start_row':data_start_row})
-    return name_col, merit_col, rank_col, data_start_row
+        return 0
 
-def _get_all_records():
-    """Return list of dicts: {'name':str,'merits':int,'row':int}
-    Iterates rows after the header row; ignores empty name rows."""
-    name_col, merit_col, rank_col, data_start = _locate_headers()
-    rows = main_sheet.get_all_values()
-    records = []
-    for idx, r in enumerate(rows[data_start-1:], start=data_start):
-        if not r or len(r) < 1:
-            continue
-        name = (r[name_col-1] if len(r) >= name_col else "").strip()
-        if not name:
-            continue
-        # parse merits safely
-        try:
-            merits = int((r[merit_col-1] if len(r) >= merit_col else "0") or 0)
-        except Exception:
-            merits = 0
-        records.append({'name': name, 'merits': merits, 'row': idx})
-    return records
+def _install_records(records, last_row, first_row):
+    """Make freshly read sheet records the current roster (cache and store)."""
+    # before load(), so the per-regiment rankings are built with them
+    merit_store.carry_regiments(records)
+    roster_cache.load(records, last_row, first_row)
+    # merit changes still waiting in the journal are newer than the sheet
+    _apply_pending_journal()
+    merit_store.replace_all(records, roster_cache.last_row)
 
-def _find_record(name):
+async def _find_record(name):
     """Case-insensitive find. Returns record dict or None."""
-    for rec in _get_all_records():
-        if rec['name'].lower() == name.lower():
-            return rec
-    return None
+    await _get_all_records()
+    return roster_cache.get(name)
+
+class SheetWriteBatch:
+    """Collects single-cell writes and sends them with as few batch_update
+    requests as possible. Cells in the same column on consecutive rows are
+    merged into one range; later writes to a cell replace earlier ones.
+    Cells are addressed by field ('name', 'merits', 'rank') and mapped to
+    columns only when flushed, so a header re-discovery redirects them."""
+
+    MAX_RANGES_PER_REQUEST = 500
+    FIELDS = {'name': 'name_col', 'merits': 'merit_col', 'rank': 'rank_col'}
+
+    def __init__(self, sheet):
+        self.sheet = sheet
+        self.cells = {}  # (row, field) -> value
+
+    def __len__(self):
+        return len(self.cells)
+
+    def set(self, row, field, value):
+        self.cells[(row, field)] = value
+
+    def ranges(self):
+        data = []
+        by_col = defaultdict(list)
+        for (row, field) in self.cells:
+            by_col[_HEADER_CACHE[self.FIELDS[field]], field].append(row)
+        for (col, field), rows in sorted(by_col.items()):
+            rows.sort()
+            run = [rows[0]]
+            for row in rows[1:] + [None]:
+                if row is not None and row == run[-1] + 1:
+                    run.append(row)
+                    continue
+                a1 = rowcol_to_a1(run[0], col)
+                if len(run) > 1:
+                    a1 += ":" + rowcol_to_a1(run[-1], col)
+                data.append({'range': a1, 'values': [[self.cells[(r, field)]] for r in run]})
+                run = [row]
+        return data
+
+    async def flush(self):
+        """Send pending writes. Returns the number of requests made."""
+        async with _sheet_layout_lock:
+            return await self._flush_locked()
+
+    async def _flush_locked(self):
+        if not self.cells:
+            return 0
+        await _locate_headers()
+        requests_made = 0
+        try:
+            try:
+                requests_made = await self._send(self.ranges())
+            except gspread_exceptions.APIError as e:
+                if _api_error_status(e) != 400:
+                    raise
+                # a column outside the grid: the headers moved, find them and retry once
+                await _locate_headers(force=True)
+                requests_made = await self._send(self.ranges())
+        except Exception:
+            # cached records were patched optimistically; reload them next read
+            roster_cache.invalidate()
+            raise
+        finally:
+            self.cells.clear()
+        return requests_made
+
+    async def _send(self, data):
+        requests_made = 0
+        for i in range(0, len(data), self.MAX_RANGES_PER_REQUEST):
+            await sheets.write(self.sheet.batch_update, data[i:i + self.MAX_RANGES_PER_REQUEST], value_input_option="USER_ENTERED")
+            requests_made += 1
+        return requests_made
+
+async def _place_record(rec, batch=None):
+    """Write a cached record that has no sheet row yet and set its 'row'.
+    The topmost blank roster row is filled in place; only when there is none
+    is a row appended. With `batch`, a filled row's cells go out on the
+    caller's flush. Returns (row, written): `written` is False only when the
+    cells are still waiting in `batch`."""
+    async with _sheet_layout_lock:
+        row = roster_cache.take_free_row()
+        if row is not None:
+            pending = batch if batch is not None else SheetWriteBatch(main_sheet)
+            pending.set(row, 'name', rec['name'])
+            pending.set(row, 'merits', rec['merits'])
+            pending.set(row, 'rank', rec['rank'] or "")
+            roster_cache.place(rec, row)
+            merit_store.save(rec)
+            if batch is None:
+                await pending._flush_locked()
+            return row, batch is None
+        # otherwise append at end; the sheet reports where the row landed
+        # (notes-only rows below the roster are not in the column reads)
+        await _locate_headers()
+        values = _row_values(rec['name'], rec['merits'], rec['rank'] or "")
+        resp = await sheets.write(main_sheet.append_row, values, idempotent=False)
+        updated = (resp or {}).get('updates', {}).get('updatedRange', "")
+        match = re.search(r'[A-Z]+(\d+)', updated.split('!')[-1])
+        roster_cache.last_row = max(roster_cache.last_row + 1, int(match.group(1)) if match else 0)
+        roster_cache.place(rec, roster_cache.last_row)
+        merit_store.set_meta('last_row', roster_cache.last_row)
+        merit_store.save(rec)
+        return rec['row'], True
+
+def _delete_row_requests(rows):
+    """deleteDimension requests for `rows`, bottom-up so no delete moves a
+    row another one still has to hit; adjacent rows share one range."""
+    runs = []
+    for row in sorted({r for r in rows if r is not None}, reverse=True):
+        if runs and runs[-1][0] == row + 1:
+            runs[-1][0] = row
+        else:
+            runs.append([row, row])
+    return [
+        {'deleteDimension': {'range': {'sheetId': main_sheet.id, 'dimension': 'ROWS', 'startIndex': first - 1, 'endIndex': last}}}
+        for first, last in runs
+    ]
+
+def _update_cell_request(row, col, value):
+    """updateCells request writing one user-entered value."""
+    kind = 'numberValue' if isinstance(value, (int, float)) else 'stringValue'
+    return {'updateCells': {
+        'range': {'sheetId': main_sheet.id, 'startRowIndex': row - 1, 'endRowIndex': row, 'startColumnIndex': col - 1, 'endColumnIndex': col},
+        'rows': [{'values': [{'userEnteredValue': {kind: value}}]}],
+        'fields': 'userEnteredValue',
+    }}
+
+async def _delete_user_rows(rows):
+    """Delete sheet rows in one batch_update."""
+    requests = _delete_row_requests(rows)
+    if not requests:
+        return
+    async with _sheet_layout_lock:
+        await sheets.write(main_sheet.spreadsheet.batch_update, {'requests': requests}, idempotent=False)
+        deleted = sorted({r for r in rows if r is not None})
+        roster_cache.delete_rows(deleted)
+        merit_store.delete_rows(deleted, roster_cache.last_row)
+
+
+# --- Merit journal (write-behind) ---
+# Commands record merit changes here and return immediately; a background
+# task copies them to the sheet. Every change is appended (and fsynced) to a
+# local JSON-lines file first, and the sequence number of the last entry the
+# sheet has accepted is kept in an .ack file, so after a crash or restart the
+# unacknowledged tail is replayed.
+MERIT_JOURNAL_PATH = os.getenv("MERIT_JOURNAL_PATH", "merit_journal.jsonl")
+JOURNAL_FLUSH_INTERVAL = float(os.getenv("JOURNAL_FLUSH_INTERVAL", "5"))
+JOURNAL_FLUSH_BATCH = 200
+
+
+class MeritJournal:
+    """Append-only log of merit changes that have not reached the sheet."""
+
+    def __init__(self, path):
+        self.path = path
+        self.ack_path = path + ".ack"
+        self.pending = []
+        self.last_seq = 0
+        self.acked_seq = 0
+
+    def open(self):
+        """Load the acknowledged position and any entries after it."""
+        try:
+            with open(self.ack_path, encoding="utf-8") as f:
+                self.acked_seq = int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            self.acked_seq = 0
+        self.last_seq = self.acked_seq
+        self.pending = []
+        torn = False
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # torn write from a crash; nothing after it was acknowledged
+                        torn = True
+                        break
+                    self.last_seq = max(self.last_seq, entry['seq'])
+                    if entry['seq'] > self.acked_seq:
+                        self.pending.append(entry)
+        except FileNotFoundError:
+            pass
+        if torn:
+            # rewrite without the partial line so new appends start clean
+            self._rewrite(self.pending)
+        return self
+
+    def _rewrite(self, entries):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            for entry in entries:
+                f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.path)
+
+    def append(self, name, merits, rank=None):
+        self.last_seq += 1
+        entry = {'seq': self.last_seq, 'name': name, 'merits': merits, 'rank': rank, 'ts': time.time()}
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.pending.append(entry)
+        return entry
+
+    def take(self, limit):
+        return self.pending[:limit]
+
+    def drop(self, keys):
+        """Forget pending entries for these name keys (e.g. purged members)."""
+        kept = [e for e in self.pending if _name_key(e['name']) not in keys]
+        if len(kept) != len(self.pending):
+            self.pending = kept
+            self._rewrite(kept)
+
+    def ack(self, seq):
+        """Mark everything up to `seq` as written to the sheet."""
+        tmp = self.ack_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(str(seq))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.ack_path)
+        self.acked_seq = seq
+        self.pending = [e for e in self.pending if e['seq'] > seq]
+        if not self.pending:
+            # fully drained: start a fresh file so it doesn't grow forever
+            self._rewrite([])
+
+
+merit_journal = MeritJournal(MERIT_JOURNAL_PATH).open()
+_journal_flush_lock = asyncio.Lock()
+
+def _apply_pending_journal():
+    """Replay unacknowledged journal entries onto freshly loaded records."""
+    for entry in merit_journal.pending:
+        rec = roster_cache.get(entry['name'])
+        if rec is None:
+            rec = {'name': entry['name'], 'merits': entry['merits'], 'rank': entry['rank'] or "", 'row': None}
+            roster_cache.add(rec)
+        roster_cache.update(rec, entry['merits'], entry['rank'])
+
+# Read-modify-write of one member's merits happens under that member's lock,
+# so two awards to the same person can't both start from the old total.
+# Different members never wait on each other. Locks live only while someone
+# holds or waits on them.
+_member_locks = weakref.WeakValueDictionary()
+
+def _member_lock(name):
+    key = _name_key(name)
+    lock = _member_locks.get(key)
+    if lock is None:
+        lock = _member_locks[key] = asyncio.Lock()
+    return lock
+
+async def _write_merits(name, points, rank_name=None):
+    """Record a merit change: update the cached roster and the local store,
+    then journal it. The sheet is updated later by the journal flusher.
+    Returns the record."""
+    await _get_all_records()
+    rec = roster_cache.get(name)
+    if rec is None:
+        rec = {'name': name, 'merits': points, 'rank': rank_name or "", 'row': None}
+        roster_cache.add(rec)
+    roster_cache.update(rec, points, rank_name)
+    # the local store is the primary copy; the journal feeds the sheet replica
+    merit_store.save(rec)
+    merit_journal.append(rec['name'], points, rank_name)
+    return rec
+
+def _record_award(rec, points, member=None):
+    """Count an award towards this month's totals and, when the member is
+    known, file the record under their regiment's leaderboard."""
+    monthly_totals.add(rec['name'], points)
+    if member is not None and roster_cache.set_regiment(rec, _regiment_of(member)):
+        merit_store.save(rec)
+
+async def _flush_merit_journal():
+    """Copy pending journal entries to the sheet. Returns how many were acked.
+    Cells are written from the cached record, which always holds the newest
+    value, so replaying an entry twice is harmless."""
+    async with _journal_flush_lock:
+        return await _flush_merit_journal_locked()
+
+async def _flush_merit_journal_locked():
+    """_flush_merit_journal for callers already holding _journal_flush_lock."""
+    entries = merit_journal.take(JOURNAL_FLUSH_BATCH)
+    if not entries:
+        return 0
+    await _get_all_records()
+    dirty = {}
+    for entry in entries:
+        key = _name_key(entry['name'])
+        dirty[key] = dirty.get(key, False) or entry['rank'] is not None
+    batch = SheetWriteBatch(main_sheet)
+    pending = []  # filled rows whose name cells are still in the batch
+    try:
+        # give new members a row first; their name cells share the batch
+        for key in dirty:
+            rec = roster_cache.by_name.get(key)
+            if rec is not None and rec['row'] is None:
+                _, written = await _place_record(rec, batch=batch)
+                if not written:
+                    pending.append(rec)
+        for key, with_rank in dirty.items():
+            rec = roster_cache.by_name.get(key)
+            if rec is None:
+                continue  # purged since it was journaled
+            batch.set(rec['row'], 'merits', rec['merits'])
+            if with_rank:
+                batch.set(rec['row'], 'rank', rec['rank'])
+        await batch.flush()
+    except Exception:
+        # filled rows never reached the sheet; place them again next time.
+        # Appended rows are already on it and keep their row.
+        for rec in pending:
+            roster_cache.unplace(rec)
+            merit_store.save(rec)
+        raise
+    merit_journal.ack(entries[-1]['seq'])
+    return len(entries)
+
+async def _reload_roster():
+    """Re-read the whole roster from the sheet. The journal is drained first
+    and its lock held throughout, so no flush can land between the column
+    fetch and the store being replaced with what was read."""
+    async with _journal_flush_lock:
+        while merit_journal.pending and await _flush_merit_journal_locked():
+            pass
+        return await _get_all_records(force=True)
 
-def _set_merits_by_row(row, points):
-    name_col, merit_col, rank_col, data_start = _locate_headers()
-    main_sheet.update_cell(row, merit_col, points)
-
-def _append_user(name, points, rank_name=None):
-    # Try to append under first empty slot after data_start if possible
-    name_col, merit_col, rank_col, data_start = _locate_headers()
-    rows = main_sheet.get_all_values()
-    # find empty row slot under name_col
-    for i, r in enumerate(rows[data_start-1:], start=data_start):
-        existing = (r[name_col-1] if len(r) >= name_col else "").strip()
-        if not existing:
-            main_sheet.insert_row([name, points, rank_name or ""], index=i)
-            return i
-    # otherwise append at end
-    main_sheet.append_row([name, points, rank_name or ""])
-    return len(rows) + 1
+async def _merit_journal_flusher():
+    while True:
+        await asyncio.sleep(JOURNAL_FLUSH_INTERVAL)
+        try:
+            await _flush_merit_journal()
+        except Exception as e:
+            print("Merit journal flush failed:", e)
+
+
+# --- External edit detection ---
+# Officers edit the sheet by hand. Instead of re-downloading it to notice, a
+# timer polls the spreadsheet's Drive modified time (one metadata request);
+# only when that moves are the Name/Merits/Rank columns fetched and diffed
+# against the cached roster. Changed rows are patched in place and bump
+# roster_cache.version; inserted/deleted/renamed rows rebuild the roster
+# from the columns already fetched.
+ROSTER_POLL_INTERVAL = float(os.getenv("ROSTER_POLL_INTERVAL", "60"))
+_sheet_watch = {}
+
+def _drive_modified_time():
+    spreadsheet = main_sheet.spreadsheet
+    getter = getattr(spreadsheet, "get_lastUpdateTime", None)
+    return getter() if getter else spreadsheet.lastUpdateTime
+
+async def _check_sheet_changes():
+    """Reload rows edited outside the bot. Returns how many rows changed."""
+    modified = await sheets.read(_drive_modified_time)
+    if modified == _sheet_watch.get('modified'):
+        return 0
+    await _get_all_records()
+    # the flush lock keeps the flusher from placing rows that aren't on the
+    # sheet yet while we fetch; the layout lock keeps other writes from
+    # moving rows between fetch and diff
+    async with _journal_flush_lock:
+        async with _sheet_layout_lock:
+            data_start, names, merits, ranks = await _fetch_roster_columns()
+            sheet_rows, last_row = _roster_rows(data_start, names, merits, ranks)
+            cached = {rec['row']: rec for rec in roster_cache.records or () if rec['row'] is not None}
+
+            structural = sheet_rows.keys() != cached.keys() or any(
+                _name_key(name) != _name_key(cached[row]['name']) for row, (name, _, _) in sheet_rows.items()
+            )
+            if structural:
+                records = [{'name': n, 'merits': m, 'rank': r, 'row': row} for row, (n, m, r) in sorted(sheet_rows.items())]
+                _install_records(records, max(last_row, roster_cache.last_row), data_start)
+                changed = len(records)
+            else:
+                # names still waiting in the journal hold newer values than the sheet
+                pending = {_name_key(e['name']) for e in merit_journal.pending}
+                changed = 0
+                for row, (name, m, r) in sheet_rows.items():
+                    rec = cached[row]
+                    if _name_key(name) in pending:
+                        continue
+                    if (rec['name'], rec['merits'], rec['rank']) != (name, m, r):
+                        rec['name'] = name
+                        roster_cache.update(rec, m, r)
+                        merit_store.save(rec)
+                        changed += 1
+    _sheet_watch['modified'] = modified
+    return changed
+
+async def _roster_change_poller():
+    while True:
+        await asyncio.sleep(ROSTER_POLL_INTERVAL)
+        try:
+            await _check_sheet_changes()
+        except Exception as e:
+            print("Sheet change check failed:", e)
 
 def _get_rank_for_points(points):
     for thr, full, abbr, roleid in reversed(RANKS):
@@ -224,9 +1386,9 @@ def _get_rank_for_points(points):
 # Role IDs for regiments
 REGIMENT_ROLES = {
     1320153442244886598: "MP",
-    1234503490886176849: "6TH",
+    1234711656811855942: "6TH",
     1357959629359026267: "3RD",
-    1387191982866038918919: "1ST",
+    1387191982866038919: "1ST",
     1251102603174215750: "4TH",
     1339571735028174919: "1AS"
 }
@@ -268,6 +1430,164 @@ def get_regiment_info(member: discord.Member):
             return {"header": header, "sheet_type": sheet_type, "regiment": role.name}
     return None
 
+def _regiment_of(member):
+    """REGIMENT_ROLES abbreviation for the member's first regiment role, if any."""
+    for role in member.roles:
+        if role.id in REGIMENT_ROLES:
+            return REGIMENT_ROLES[role.id]
+    return None
+
+# --- Nickname codec ---
+# Nicknames read "[𝓡𝓛] {REGIMENT} RANK | Username"; the [𝓡𝓛] prefix, the
+# regiment and the rank may each be missing. Every rank change (awards,
+# promote, sync, officer promote/demote) parses and renders through here,
+# so they all write the same nickname for the same member and rank.
+NICK_MAX_LENGTH = 32  # Discord's limit
+_NICK_RL_RE = re.compile(r"^\[𝓡𝓛\]\s*")
+_NICK_REGIMENT_RE = re.compile(r"^\{(.*?)\}\s*")
+_NICK_RANK_RE = re.compile(r"^(.*?)\s*\|\s*(.*)$")
+
+@functools.lru_cache(maxsize=4096)
+def _parse_nickname(nick):
+    """(rl, regiment, rank, username) for a nickname; missing parts are None.
+    Without a '|' the last word is taken as the username."""
+    rest = (nick or "").strip()
+    match = _NICK_RL_RE.match(rest)
+    rl = match is not None
+    if rl:
+        rest = rest[match.end():]
+    regiment = None
+    match = _NICK_REGIMENT_RE.match(rest)
+    if match:
+        regiment = match.group(1).strip() or None
+        rest = rest[match.end():]
+    match = _NICK_RANK_RE.match(rest)
+    if match:
+        rank, username = match.group(1) or None, match.group(2).strip() or None
+    else:
+        rank, username = None, (rest.split() or [None])[-1]
+    return rl, regiment, rank, username
+
+@functools.lru_cache(maxsize=4096)
+def _render_nickname(rl, regiment, rank, username):
+    """The nickname for these parts, cut to Discord's length limit."""
+    prefix = "[𝓡𝓛] " if rl else ""
+    return f"{prefix}{{{regiment or 'UNK'}}} {rank} | {username}"[:NICK_MAX_LENGTH]
+
+def _rank_nickname(member, rank_abbr, roblox_username=None):
+    """The member's nickname with its rank part set to `rank_abbr`. The
+    [𝓡𝓛] prefix, regiment and username already in it are kept; a missing
+    regiment comes from the member's regiment role and a missing username
+    from `roblox_username`."""
+    rl, regiment, _, username = _parse_nickname(member.nick or member.display_name or "")
+    return _render_nickname(rl, regiment or _regiment_of(member), rank_abbr,
+                            username or roblox_username or member.name)
+
+# --- Guild member index ---
+# Per guild, dictionaries from username, display name (exact and lowercased)
+# and Roblox name to member id, so resolving a command target or matching a
+# sheet row is a few dict lookups instead of a scan of every member. Each
+# guild is indexed from the member cache on first use; the listeners below
+# keep it current as nicknames change and members come and go.
+_MENTION_OR_ID = re.compile(r"<@!?(\d+)>|(\d+)")
+
+class MemberIndex:
+    # lookup order for resolve(); exact forms win over case-insensitive ones
+    FIELDS = ('name', 'display', 'roblox', 'name_ci', 'display_ci')
+
+    def __init__(self):
+        self.guilds = {}  # guild_id -> {field: {key: member_id}}
+        self.keys = {}    # guild_id -> {member_id: {field: key}}
+
+    @staticmethod
+    def _keys_for(member):
+        return {
+            'name': member.name,
+            'display': member.display_name,
+            'roblox': _name_key(extract_roblox_name(member.display_name)),
+            'name_ci': member.name.lower(),
+            'display_ci': member.display_name.lower(),
+        }
+
+    def _ensure(self, guild):
+        if guild.id not in self.guilds:
+            self.guilds[guild.id] = {field: {} for field in self.FIELDS}
+            self.keys[guild.id] = {}
+            for member in guild.members:
+                self.add(member)
+        return self.guilds[guild.id]
+
+    def _lookup(self, guild, field, key):
+        member_id = self._ensure(guild)[field].get(key)
+        return guild.get_member(member_id) if member_id else None
+
+    def get(self, guild, roblox_name):
+        """Member whose nickname carries `roblox_name`."""
+        return self._lookup(guild, 'roblox', _name_key(roblox_name))
+
+    def resolve(self, guild, text):
+        """Member for a mention, ID, username, display name or Roblox name."""
+        text = str(text).strip()
+        match = _MENTION_OR_ID.fullmatch(text)
+        if match:
+            member = guild.get_member(int(match.group(1) or match.group(2)))
+            if member or match.group(1):
+                return member
+        candidates = {'name': text, 'display': text, 'roblox': _name_key(text), 'name_ci': text.lower(), 'display_ci': text.lower()}
+        for field in self.FIELDS:
+            member = self._lookup(guild, field, candidates[field])
+            if member:
+                return member
+        return None
+
+    def add(self, member):
+        maps = self.guilds.get(member.guild.id)
+        if maps is None:
+            return  # built in full on first use
+        self.remove(member)
+        keys = self._keys_for(member)
+        for field, key in keys.items():
+            maps[field][key] = member.id
+        self.keys[member.guild.id][member.id] = keys
+
+    def remove(self, member):
+        maps = self.guilds.get(member.guild.id)
+        if maps is None:
+            return
+        keys = self.keys[member.guild.id].pop(member.id, None) or {}
+        for field, key in keys.items():
+            if maps[field].get(key) == member.id:
+                del maps[field][key]
+
+member_index = MemberIndex()
+
+async def resolve_member(ctx, target):
+    """Shared target parsing for commands: mention, ID, username, display
+    name or Roblox name, exact before case-insensitive. None if no match."""
+    return member_index.resolve(ctx.guild, target)
+
+@bot.listen('on_member_join')
+async def _index_member_join(member):
+    member_index.add(member)
+
+@bot.listen('on_member_remove')
+async def _index_member_remove(member):
+    member_index.remove(member)
+
+@bot.listen('on_member_update')
+async def _index_member_update(before, after):
+    if (before.name, before.display_name) != (after.name, after.display_name):
+        member_index.add(after)
+
+@bot.listen('on_user_update')
+async def _index_user_update(before, after):
+    # members without a server nickname show their account name
+    if (before.name, before.display_name) != (after.name, after.display_name):
+        for guild in bot.guilds:
+            member = guild.get_member(after.id)
+            if member is not None:
+                member_index.add(member)
+
 async def log_award(ctx, giver, receiver, points, total, rank, status):
     log_channel = ctx.guild.get_channel(LOG_CHANNEL_ID)
     if log_channel:
@@ -283,13 +1603,37 @@ async def log_award(ctx, giver, receiver, points, total, rank, status):
         embed.add_field(name="new total", value=str(total), inline=True)
         embed.add_field(name="new rank", value=rank, inline=True)
         await log_channel.send(embed=embed)
-    
+
+async def log_award_summary(ctx, awards):
+    """One log-channel embed for a whole award command; flagged awards are
+    logged one by one with log_award instead."""
+    log_channel = ctx.guild.get_channel(LOG_CHANNEL_ID)
+    if log_channel and awards:
+        lines = [
+            f"{a['member'].mention}: +{a['points']} → {a['total']} ({a['rank'][1]}), "
+            f"{a['hourly']}/{MAX_POINTS_HOURLY} this hour"
+            for a in awards
+        ]
+        embed = discord.Embed(
+            title=f"merit awards logged ({len(awards)})",
+            description="\n".join(lines)[:4000],
+            color=discord.Color.gold(),
+            timestamp=datetime.utcnow()
+        )
+        embed.add_field(name="given by", value=f"{ctx.author.mention} ({ctx.author.id})", inline=False)
+        await log_channel.send(embed=embed)
+
+# Discord role/nick edits run at most this many at a time per award command.
+AWARD_EDIT_CONCURRENCY = int(os.getenv("AWARD_EDIT_CONCURRENCY", "5"))
+
 @bot.command()
 @commands.has_any_role(*HOST_ROLES)
 async def awardpoints(ctx, *args):
     """
     Usage: !awardpoints <member...> <points>
     Members can be mentions, IDs, or usernames/display names (space-separated).
+    A leading + (e.g. +Name) adds a member not on the roster as a new row even
+    when their name is close to an existing one.
     The last argument must be the integer points to award.
     """
     if len(args) < 2:
@@ -303,60 +1647,120 @@ async def awardpoints(ctx, *args):
 
     if points <= 0:
         return await ctx.send("Points must be a positive number.")
+    if points > MAX_POINTS_SINGLE_AWARD:
+        return await ctx.send(f"❌ A single award is capped at {MAX_POINTS_SINGLE_AWARD} points.")
 
     member_inputs = args[:-1]
     results = []
-
-    # Pre-map mentions for quick lookup (mention text -> Member)
-    mention_map = {}
-    if ctx.message.mentions:
-        for m in ctx.message.mentions:
-            # canonical mention forms
-            mention_map[f"<@{m.id}>"] = m
-            mention_map[f"<@!{m.id}>"] = m
-            mention_map[str(m.id)] = m
+    members = []
+    new_ok = set()
 
     for input_str in member_inputs:
-        member = None
-        raw = input_str.strip()
-
-        # 1) Direct mention forms or direct ID
-        if raw in mention_map:
-            member = mention_map[raw]
-        else:
-            stripped = re.sub(r"[<@!>]", "", raw)
-            if stripped.isdigit():
-                member = ctx.guild.get_member(int(stripped))
-
-        # 2) Try by exact username / display_name
-        if not member:
-            member = find(lambda m: m.name == raw or m.display_name == raw, ctx.guild.members)
-
-        # 3) Try case-insensitive username/display_name partial fallback
-        if not member:
-            lowered = raw.lower()
-            member = find(
-                lambda m: m.name.lower() == lowered or m.display_name.lower() == lowered,
-                ctx.guild.members,
-            )
-
+        forced = input_str.startswith("+") and len(input_str) > 1
+        if forced:
+            input_str = input_str[1:]
+        member = await resolve_member(ctx, input_str)
         if not member:
-            results.append(f"Could not find member: `{input_str}`")
+            close = roster_cache.search.suggest(input_str) if roster_cache.records is not None else []
+            hint = f" Did you mean {', '.join(f'`{name}`' for name, _ in close)}?" if close else ""
+            results.append(f"Could not find member: `{input_str}`.{hint}")
+            continue
+        if member in members:
+            results.append(f"{member.display_name}: listed more than once, awarded once.")
             continue
+        members.append(member)
+        if forced:
+            new_ok.add(member.id)
 
+    # Read the roster once, then compute and journal every new total
+    try:
+        await _get_all_records()
+    except Exception as e:
+        return await ctx.send(f"❌ Failed to load data: {e}")
+    awards = []
+    for member in members:
+        # flag anything past the hourly cap before it reaches the sheet
+        key = (ctx.author.id, member.id)
+        allowed, used = award_limiter.try_acquire(key, points)
+        if not allowed:
+            status = f"flagged: {points} more would exceed {MAX_POINTS_HOURLY}/hour ({used} already given this hour)"
+            results.append(f"⚠️ {member.display_name}: not awarded, {status}.")
+            rec = roster_cache.get(extract_roblox_name(member.display_name))
+            with contextlib.suppress(discord.HTTPException):
+                await log_award(ctx, ctx.author, member, points, rec['merits'] if rec else "—", rec['rank'] if rec else "—", status)
+            continue
         try:
-            msg = await _process_award(ctx, member, points)
-            results.append(msg)
+            award = await _award_merits(member, points, new_ok=member.id in new_ok)
         except Exception as e:
-            results.append(f"Error processing `{member.display_name}`: {e}")
+            award = f"Error processing `{member.display_name}`: {e}"
+        if isinstance(award, str):
+            award_limiter.refund(key, points)
+            results.append(award)
+        else:
+            award['hourly'] = used + points
+            awards.append(award)
 
-    await ctx.send("\n".join(results))
+    # All of them reach the sheet in one batched update
+    try:
+        await _flush_merit_journal()
+    except Exception as e:
+        results.append(f"⚠️ Sheet update delayed ({e}); it will be retried in the background.")
 
+    # Role and nickname edits run side by side, a few at a time
+    limit = asyncio.Semaphore(AWARD_EDIT_CONCURRENCY)
 
-async def _process_award(ctx: commands.Context, member: discord.Member, points: int) -> str:
+    async def apply(award):
+        async with limit:
+            try:
+                status = await _apply_award_roles(ctx, award)
+            except Exception as e:
+                return f"Error processing `{award['member'].display_name}`: {e}"
+            return status
+
+    results.extend(await asyncio.gather(*(apply(award) for award in awards)))
+    await ctx.send("\n".join(results))
+    # one log message per command, sent after the reply
+    with contextlib.suppress(discord.HTTPException):
+        await log_award_summary(ctx, awards)
+
+
+def _plan_member_edit(member, remove=(), add=(), nick=None):
+    """Keyword arguments for the single member.edit() that drops the role ids
+    in `remove`, adds those in `add` and sets `nick`. Only what actually
+    changes is included; an empty dict means the member needs no edit."""
+    remove = set(remove) - set(add)
+    roles = [r for r in member.roles if r.id not in remove and not r.is_default()]
+    have = {r.id for r in roles}
+    for role_id in add:
+        role = member.guild.get_role(role_id)
+        if role and role_id not in have:
+            roles.append(role)
+            have.add(role_id)
+    changes = {}
+    if have != {r.id for r in member.roles if not r.is_default()}:
+        changes['roles'] = roles
+    if nick is not None and nick != member.nick:
+        changes['nick'] = nick
+    return changes
+
+def _rank_edit(member, role_id=None, nick=None):
+    """The member.edit() arguments swapping every rank role for `role_id`
+    (left alone when None) and setting `nick`."""
+    if role_id is None:
+        return _plan_member_edit(member, nick=nick)
+    return _plan_member_edit(member, remove=[rdef[3] for rdef in RANKS], add=[role_id], nick=nick)
+
+# Roster names at least this close to a new name hold its award back as a
+# probable duplicate (fuzzywuzzy ratio, 0-100).
+FUZZY_DUPLICATE_SCORE = int(os.getenv("FUZZY_DUPLICATE_SCORE", "90"))
+
+async def _award_merits(member: discord.Member, points: int, new_ok: bool = False):
     """
-    Core logic to award points to a single member and update sheet/roles/nickname.
-    Returns a short status string for that member.
+    Add points to a member's roster total. The sheet write goes through the
+    merit journal. Returns the award (member, name, points, total, rank) or,
+    when the member can't be awarded, a short status string. A name that is
+    not on the roster but close to one that is gets held back unless
+    `new_ok` says it really is a new recruit.
     """
     roblox_username = extract_roblox_name(member.display_name)
     if roblox_username == "Unknown":
@@ -366,147 +1770,250 @@ async def _process_award(ctx: commands.Context, member: discord.Member, points:
     if not info:
         return f"{member.display_name}: Unsupported regiment."
 
-    sheet = main_sheet if info.get("sheet_type") == "main" else main_sheet
+    async with _member_lock(roblox_username):
+        # find current merits (served from the roster cache)
+        try:
+            rec = await _find_record(roblox_username)
+        except RuntimeError:
+            return f"{roblox_username}: Missing sheet headers (Name, Merits, Rank)."
+        if rec:
+            current_merits = rec['merits']
+        else:
+            # a near miss is more likely a nickname typo than a new recruit
+            close = [] if new_ok else roster_cache.search.suggest(roblox_username, limit=1, min_score=FUZZY_DUPLICATE_SCORE)
+            if close:
+                return (f"{roblox_username}: not on the roster — did you mean `{close[0][0]}`? Fix their nickname, "
+                        f"or list them as `+{roblox_username}` to add them as a new recruit.")
+            # Not in DB: use their current Discord role baseline from RANKS
+            member_role_ids = {r.id for r in member.roles}
+            existing_threshold = next((t for t, _, _, rid in RANKS if rid in member_role_ids), 0)
+            current_merits = existing_threshold
+
+        # Compute updated total and new rank
+        new_total = current_merits + points
+        new_rank = next((r for r in reversed(RANKS) if new_total >= r[0]), RANKS[0])
+
+        # Journal the new total; the flusher inserts or updates the sheet row
+        rec = await _write_merits(rec['name'] if rec else roblox_username, new_total, new_rank[1])
+        _record_award(rec, points, member)
+    return {'member': member, 'name': roblox_username, 'points': points, 'total': new_total, 'rank': new_rank}
+
+async def _apply_award_roles(ctx: commands.Context, award) -> str:
+    """Give an awarded member their rank role and nickname in one edit.
+    Returns the status line for the award."""
+    member, roblox_username = award['member'], award['name']
+    points, new_total = award['points'], award['total']
+    _, _, new_rank_abbr, new_rank_role_id = award['rank']
+
+    # Rank role and nickname in one edit, skipped when both are already right
+    changes = _rank_edit(member, new_rank_role_id, _rank_nickname(member, new_rank_abbr, roblox_username))
+    if not changes:
+        return f"{roblox_username}: Awarded {points} merits (total {new_total}, rank {new_rank_abbr})"
+
+    # Role hierarchy check before editing
+    if ctx.guild.me.top_role <= member.top_role:
+        # We updated the sheet; but cannot change roles/nick due to hierarchy
+        return f"{roblox_username}: Awarded {points} merits (total {new_total}, rank {new_rank_abbr}) — could not update roles/nickname due to role hierarchy."
 
-    # Find headers on sheet
     try:
-        name_cell = sheet.find("Name")
-        merit_cell = sheet.find("Merits")
-        rank_cell = sheet.find("Rank")
-    except gspread_exceptions.CellNotFound:
-        return f"{roblox_username}: Missing sheet headers (Name, Merits, Rank)."
-
-    if not (name_cell and merit_cell and rank_cell):
-        return f"{roblox_username}: Could not locate headers."
+        await member.edit(**changes)
+    except discord.Forbidden:
+        return f"{roblox_username}: Awarded {points} merits (total {new_total}, rank {new_rank_abbr}) — missing permissions to update roles/nickname."
+    except Exception as e:
+        return f"{roblox_username}: Awarded {points} merits (total {new_total}, rank {new_rank_abbr}) — error updating member: {e}"
 
-    name_col, merit_col, rank_col = name_cell.col, merit_cell.col, rank_cell.col
-    data_start_row = name_cell.row + 1
+    return f"{roblox_username}: Awarded {points} merits (total {new_total}, rank {new_rank_abbr})"
 
-    # Read existing names under header
-    existing_names = sheet.col_values(name_col)[data_start_row - 1 :]
+# --- Leaderboard pages ---
+# Rendered pages are cached per roster/monthly version: paging back and forth
+# reuses them, and the first view after a merit change renders afresh.
+# A scope is None (everyone), ('regiment', 'ABBR') or ('month', 'YYYY-MM').
+LEADERBOARD_PAGE_SIZE = 10
+_leaderboard_pages = {'version': None, 'pages': {}}
+
+def _leaderboard_board(scope):
+    if scope is None:
+        return roster_cache.leaderboard
+    kind, value = scope
+    if kind == 'regiment':
+        return roster_cache.regiments.get(value) or LeaderboardIndex()
+    return monthly_totals.board(value)
+
+def _leaderboard_page_count(scope=None):
+    return max(1, -(-len(_leaderboard_board(scope)) // LEADERBOARD_PAGE_SIZE))
+
+def _leaderboard_page(page, viewer_name=None, scope=None):
+    """Embed for 1-based `page` of `scope`, footer personalised for `viewer_name`."""
+    version = (roster_cache.version, monthly_totals.version)
+    if _leaderboard_pages['version'] != version:
+        _leaderboard_pages['version'] = version
+        _leaderboard_pages['pages'].clear()
+    ranking = _leaderboard_board(scope)
+    pages = _leaderboard_page_count(scope)
+    page = min(max(page, 1), pages)
+    cached = _leaderboard_pages['pages'].get((scope, page))
+    if cached is None:
+        first = (page - 1) * LEADERBOARD_PAGE_SIZE
+        label = f" – {scope[1]}" if scope else ""
+        unit = "pts this month" if scope and scope[0] == 'month' else "pts"
+        cached = discord.Embed(title=f"🏆 Leaderboard{label} – Page {page}/{pages}", color=discord.Color.purple())
+        for rec in ranking.top(LEADERBOARD_PAGE_SIZE, first):
+            place, _ = ranking.position(rec)
+            cached.add_field(name=f"{place}. {rec['name']}", value=f"{rec['merits']} {unit}", inline=False)
+        if not len(ranking):
+            cached.description = "Nobody here yet."
+        _leaderboard_pages['pages'][(scope, page)] = cached
+    embed = cached.copy()
+    own = ranking.get(viewer_name) if viewer_name else None
+    if own is not None:
+        place, tied = ranking.position(own)
+        embed.set_footer(text=f"You: #{place} of {len(ranking)}" + (f" (tied with {tied})" if tied else ""))
+    return embed, page
+
+class LeaderboardView(discord.ui.View):
+    def __init__(self, author_id, viewer_name, page=1, scope=None):
+        super().__init__(timeout=300)  # 5 minute timeout
+        self.author_id = author_id
+        self.viewer_name = viewer_name
+        self.page = page
+        self.scope = scope
+        self.message = None
+
+    async def is_author(self, interaction: discord.Interaction):
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("run !leaderboard to page through your own copy", ephemeral=True)
+            return False
+        return True
 
-    # find current merits
-    row = None
-    try:
-        idx = existing_names.index(roblox_username)
-        row = data_start_row + idx
-        current_merits = int(sheet.cell(row, merit_col).value or 0)
-    except ValueError:
-        # Not in DB: use their current Discord role baseline from RANKS
-        member_role_ids = {r.id for r in member.roles}
-        existing_threshold = next((t for t, _, _, rid in RANKS if rid in member_role_ids), 0)
-        current_merits = existing_threshold
-        row = None
-
-    # Compute updated total and new rank
-    new_total = current_merits + points
-    new_rank = next((r for r in reversed(RANKS) if new_total >= r[0]), RANKS[0])
-    new_rank_name = new_rank[1]
-    new_rank_abbr = new_rank[2]
-    new_rank_role_id = new_rank[3]
-
-    # Insert or update sheet
-    if row is None:
-        # find first empty slot or append
-        insert_row = None
-        for i, name in enumerate(existing_names):
-            if not name or not name.strip():
-                insert_row = data_start_row + i
-                break
-        if insert_row is None:
-            insert_row = data_start_row + len(existing_names)
-        sheet.insert_row([roblox_username, new_total, new_rank_name], index=insert_row)
-    else:
-        sheet.update_cell(row, merit_col, new_total)
-        sheet.update_cell(row, rank_col, new_rank_name)
-
-    # Update roles: remove old rank roles, append new rank role
-    old_role_ids = {rdef[3] for rdef in RANKS}
-    cleaned_roles = [r for r in member.roles if r.id not in old_role_ids]
-
-    new_role = ctx.guild.get_role(new_rank_role_id)
-    if new_role and new_role not in cleaned_roles:
-        cleaned_roles.append(new_role)
-
-       # Nickname handling:
-    # Cases handled:
-    #  1. "{REGIMENT} RANK | Username"
-    #  2. "[𝓡𝓛] {REGIMENT} RANK | Username"
-    #  3. "[𝓡𝓛] RANK | Username"
-    #  4. "RANK | Username"
-    original_nick = member.nick or member.display_name or ""
-    pattern = r"^(?:\[𝓡𝓛\]\s*)?(?:\{.*?\}\s+)?(\S+)\s+\|\s+(.+)$"
-    match = re.match(pattern, original_nick)
+    async def show(self, interaction: discord.Interaction, page):
+        if not await self.is_author(interaction):
+            return
+        await _get_all_records()
+        embed, self.page = _leaderboard_page(page, self.viewer_name, self.scope)
+        await interaction.response.edit_message(embed=embed, view=self)
 
-    if match:
-        # got the captured parts
-        rank_part, username_part = match.groups()
+    @discord.ui.button(emoji='⏮️', style=discord.ButtonStyle.gray)
+    async def first_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, 1)
 
-        # keep regiment if present, else fallback
-        regiment_match = re.match(r"^(?:\[𝓡𝓛\]\s*)?(\{.*?\})", original_nick)
-        if regiment_match:
-            regiment_part = regiment_match.group(1)
-        else:
-            regiment_part = "{UNK}"
+    @discord.ui.button(emoji='◀️', style=discord.ButtonStyle.blurple)
+    async def prev_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, self.page - 1)
 
-        # if original had [𝓡𝓛], keep it
-        rl_prefix = "[𝓡𝓛] " if original_nick.strip().startswith("[𝓡𝓛]") else ""
+    @discord.ui.button(label='Me', style=discord.ButtonStyle.green, emoji='🎯')
+    async def my_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        if not await self.is_author(interaction):
+            return
+        await _get_all_records()
+        ranking = _leaderboard_board(self.scope)
+        own = ranking.get(self.viewer_name)
+        if own is None:
+            await interaction.response.send_message("❌ You're not on this leaderboard.", ephemeral=True)
+            return
+        place, _ = ranking.position(own)
+        await self.show(interaction, (place - 1) // LEADERBOARD_PAGE_SIZE + 1)
 
-        raw_nick = f"{rl_prefix}{regiment_part} {new_rank_abbr} | {username_part}"
-    else:
-        # fallback: rebuild from scratch
-        regiment_abbr = "UNK"
-        for rid, abbr in REGIMENT_ROLES.items():
-            if any(role.id == rid for role in member.roles):
-                regiment_abbr = abbr
-                break
-        raw_nick = f"{{{regiment_abbr}}} {new_rank_abbr} | {roblox_username}"
+    @discord.ui.button(emoji='▶️', style=discord.ButtonStyle.blurple)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, self.page + 1)
 
-    new_nick = raw_nick[:32]  # Discord max nick length
+    @discord.ui.button(emoji='⏭️', style=discord.ButtonStyle.gray)
+    async def last_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show(interaction, _leaderboard_page_count(self.scope))
 
-    # Role hierarchy check before editing
-    if ctx.guild.me.top_role <= member.top_role:
-        # We updated the sheet; but cannot change roles/nick due to hierarchy
-        return f"{roblox_username}: Awarded {points} merits (total {new_total}, rank {new_rank_abbr}) — could not update roles/nickname due to role hierarchy."
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message:
+            with contextlib.suppress(discord.HTTPException):
+                await self.message.edit(view=self)
 
+@bot.command()
+async def leaderboard(ctx, *args):
+    """Show the merit ranking, 10 per page, with buttons to page through it.
+    `!leaderboard [page]`, `!leaderboard regiment <X> [page]`,
+    `!leaderboard month <YYYY-MM> [page]`"""
+    scope = None
+    if args and args[0].lower() in ('regiment', 'month'):
+        if len(args) < 2:
+            return await ctx.send("Usage: `!leaderboard regiment <X>` or `!leaderboard month <YYYY-MM>`")
+        kind, value, args = args[0].lower(), args[1], args[2:]
+        if kind == 'regiment':
+            value = value.strip('{}').upper()
+            if value not in REGIMENT_ROLES.values():
+                return await ctx.send(f"❌ Unknown regiment. Try one of: {', '.join(sorted(set(REGIMENT_ROLES.values())))}")
+        elif not re.fullmatch(r"\d{4}-\d{2}", value):
+            return await ctx.send("❌ Month must look like `2024-05`.")
+        scope = (kind, value)
     try:
-        await member.edit(roles=cleaned_roles, nick=new_nick)
-    except discord.Forbidden:
-        return f"{roblox_username}: Awarded {points} merits (total {new_total}, rank {new_rank_abbr}) — missing permissions to update roles/nickname."
+        page = int(args[0]) if args else 1
+    except ValueError:
+        return await ctx.send("❌ Page must be a number.")
+    try:
+        # served from the cached roster's rankings; the sheet is not read
+        await _get_all_records()
     except Exception as e:
-        return f"{roblox_username}: Awarded {points} merits (total {new_total}, rank {new_rank_abbr}) — error updating member: {e}"
+        return await ctx.send(f"❌ Failed to load data: {e}")
+    viewer_name = extract_roblox_name(ctx.author.display_name)
+    embed, page = _leaderboard_page(page, viewer_name, scope)
+    view = LeaderboardView(ctx.author.id, viewer_name, page, scope)
+    view.message = await ctx.send(embed=embed, view=view)
+
+def _leaderboard_place(rec, shown=5):
+    """'#place' for a record, naming the first few members who share it."""
+    place, tied = roster_cache.leaderboard.position(rec)
+    if not tied:
+        return f"#{place}"
+    others = [r['name'] for r in roster_cache.leaderboard.ties(rec['merits']) if r is not rec]
+    names = ", ".join(others[:shown]) + (f" and {len(others) - shown} more" if len(others) > shown else "")
+    return f"#{place} (tied with {names})"
 
-    return f"{roblox_username}: Awarded {points} merits (total {new_total}, rank {new_rank_abbr})"
 @bot.command()
-async def leaderboard(ctx):
-    """Show top 10 from main_sheet."""
+async def whois(ctx, *, name: str):
+    """Look a Roblox name up on the roster, with suggestions for near misses."""
     try:
-        records = _get_all_records()
+        rec = await _find_record(name)
     except Exception as e:
         return await ctx.send(f"❌ Failed to load data: {e}")
-    sorted_records = sorted(records, key=lambda x: x['merits'], reverse=True)[:10]
-    embed = discord.Embed(title="🏆 Leaderboard – Top 10", color=discord.Color.purple())
-    for i, rec in enumerate(sorted_records, start=1):
-        embed.add_field(name=f"{i}. {rec['name']}", value=f"{rec['merits']} pts", inline=False)
-    await ctx.send(embed=embed)@bot.command()
+    if rec is None:
+        close = roster_cache.search.suggest(name, limit=5, min_score=60)
+        if not close:
+            return await ctx.send(f"❌ `{name}` is not on the roster.")
+        lines = "\n".join(f"`{match}` ({score}%)" for match, score in close)
+        return await ctx.send(f"❓ `{name}` is not on the roster. Did you mean:\n{lines}")
+    embed = discord.Embed(title=f"🔎 {rec['name']}", color=discord.Color.blue())
+    embed.add_field(name="Merits", value=str(rec['merits']))
+    embed.add_field(name="Rank", value=rec['rank'] or "—")
+    embed.add_field(name="Regiment", value=rec.get('regiment') or "—")
+    embed.add_field(name="Leaderboard", value=_leaderboard_place(rec))
+    member = member_index.get(ctx.guild, rec['name'])
+    embed.add_field(name="Discord", value=member.mention if member else "not in this server", inline=False)
+    await ctx.send(embed=embed)
+
+@bot.command()
 async def mypoints(ctx):
     roblox_name = extract_roblox_name(ctx.author.display_name)
     try:
-        rec = _find_record(roblox_name)
+        rec = await _find_record(roblox_name)
         if not rec:
             return await ctx.send("❌ You don't have any points yet.")
         total = rec['merits']
         embed = discord.Embed(title="📊 Your Points", color=discord.Color.blue())
         embed.add_field(name="Roblox Username", value=roblox_name)
         embed.add_field(name="Total Points", value=str(total))
-        embed.set_footer(text="Note: Monthly breakdown not stored in this sheet.")
+        embed.add_field(name="Leaderboard", value=_leaderboard_place(rec))
+        this_month = datetime.utcnow().strftime("%Y-%m")
+        monthly = monthly_totals.board(this_month).get(rec['name'])
+        embed.add_field(name=f"This Month ({this_month})", value=str(monthly['merits'] if monthly else 0))
         return await ctx.send(embed=embed)
     except Exception as e:
-        return await ctx.send(f"Error: {e}")@bot.command()
+        return await ctx.send(f"Error: {e}")
+
+@bot.command()
 async def pointsneeded(ctx):
     roblox_name = extract_roblox_name(ctx.author.display_name)
     try:
-        rec = _find_record(roblox_name)
+        rec = await _find_record(roblox_name)
         if not rec:
             return await ctx.send("❌ You don't have any points yet.")
         points = rec['merits']
@@ -533,33 +2040,21 @@ async def promote(ctx, *targets):
             continue
 
         roblox_name = extract_roblox_name(member.display_name)
-        total = None
-        for sheet in [main_sheet]:
-            data = sheet.get_all_values()
-            for row in data:
-                if len(row) >= 2 and row[0].strip().lower() == roblox_name.lower():
-                    total = int(row[1])
-                    break
-            if total is not None:
-                break
-
-        if total is None:
+        rec = await _find_record(roblox_name)
+        if rec is None:
             embed.add_field(name=roblox_name, value="❌ Not found in tracker.", inline=False)
             continue
+        total = rec['merits']
 
-        rank = get_rank(total)
-        regiment = get_regiment(member)
-        nickname = f"{{{regiment}}} {rank[1]} {roblox_name}"  # Only use Roblox username
+        rank = _get_rank_for_points(total)
+        nickname = _rank_nickname(member, rank[2], roblox_name)
 
+        changes = _rank_edit(member, rank[3], nickname)
+        if not changes:
+            embed.add_field(name=nickname, value=f"Already **{rank[1]}**.", inline=False)
+            continue
         try:
-            await member.edit(nick=nickname)
-            # Remove old ranks
-            for _, _, _, rid in RANKS:
-                role = ctx.guild.get_role(rid)
-                if role and role in member.roles:
-                    await member.remove_roles(role)
-            # Add new rank
-            await member.add_roles(ctx.guild.get_role(rank[3]))
+            await member.edit(**changes)
             embed.add_field(name=nickname, value=f"🎖️ Promoted to **{rank[1]}**", inline=False)
         except discord.Forbidden:
             embed.add_field(name=nickname, value="❌ Missing permission to update nickname or roles.", inline=False)
@@ -570,33 +2065,21 @@ async def promote(ctx, *targets):
 async def selfpromote(ctx):
     member = ctx.author
     roblox_name = extract_roblox_name(member.display_name)
-    total = None
-
-    for sheet in [main_sheet]:
-        data = sheet.get_all_values()
-        for row in data:
-            if len(row) >= 2 and row[0].strip().lower() == roblox_name.lower():
-                total = int(row[1])
-                break
-        if total is not None:
-            break
-
-    if total is None:
+    rec = await _find_record(roblox_name)
+    if rec is None:
         return await ctx.send("❌ You don't have any points yet.")
+    total = rec['merits']
 
-    rank = get_rank(total)
-    nickname = f"{{{regiment}}} {rank[1]} {roblox_name}"  # no rank prefix
+    rank = _get_rank_for_points(total)
+    nickname = _rank_nickname(member, rank[2], roblox_name)
 
+    changes = _rank_edit(member, rank[3], nickname)
+    if not changes:
+        return await ctx.send(f"You are already **{rank[1]}**.")
     try:
-        await member.edit(nick=nickname)
+        await member.edit(**changes)
     except discord.Forbidden:
-        return await ctx.send("❌ I can't change your nickname. Please ask an admin.")
-
-    for _, _, _, rid in RANKS:
-        role = ctx.guild.get_role(rid)
-        if role and role in member.roles:
-            await member.remove_roles(role)
-    await member.add_roles(ctx.guild.get_role(rank[3]))
+        return await ctx.send("❌ I can't change your nickname or roles. Please ask an admin.")
 
     embed = discord.Embed(
         title="📈 Self Promotion",
@@ -605,35 +2088,157 @@ async def selfpromote(ctx):
     )
     await ctx.send(embed=embed)
 
+# --- Sync ---
+# !sync first works out a plan: only rows whose merits, Rank cell, rank role
+# or nickname differ from what the merits say. The plan is applied in
+# batches, and one status message is edited as it goes. Members already
+# handled are checkpointed in the merit store, so a sync that dies part way
+# resumes with the rest; the checkpoint is cleared when a sync completes.
+# A member is only skipped while their merits still match the checkpoint,
+# and checkpoints older than SYNC_CHECKPOINT_TTL seconds are ignored.
+SYNC_BATCH_SIZE = int(os.getenv("SYNC_BATCH_SIZE", "25"))
+SYNC_CHECKPOINT_TTL = int(os.getenv("SYNC_CHECKPOINT_TTL", "21600"))
+
+def _load_sync_checkpoint():
+    """{name key: merits when synced} from an unexpired checkpoint, else {}."""
+    checkpoint = json.loads(merit_store.get_meta('sync_checkpoint') or "null")
+    if not isinstance(checkpoint, dict) or not isinstance(checkpoint.get('done'), dict):
+        return {}
+    if time.time() - checkpoint.get('at', 0) > SYNC_CHECKPOINT_TTL:
+        return {}
+    return checkpoint['done']
+
+def _plan_sync(guild, records, done=None):
+    """List of per-member changes needed to bring the sheet and Discord in line.
+    Members in `done` are skipped unless their merits changed since."""
+    done = done or {}
+    plan = []
+    rank_ids = {rdef[3] for rdef in RANKS}
+    for rec in records:
+        key = _name_key(rec['name'])
+        if done.get(key) == rec['merits']:
+            continue
+        member = member_index.get(guild, rec['name'])
+        if not member:
+            continue
+        # ensure merits honor existing rank roles
+        user_roles = {r.id for r in member.roles}
+        existing_threshold = next((thr for thr, _, _, rid in RANKS if rid in user_roles), 0)
+        threshold, rank_name, rank_abbr, role_id = _get_rank_for_points(max(rec['merits'], existing_threshold))
+        step = {'key': key, 'name': rec['name'], 'member_id': member.id, 'regiment': _regiment_of(member), 'rank_name': rank_name}
+        if rec['merits'] < existing_threshold:
+            step['bump'] = existing_threshold
+        if rec['rank'] != rank_name:
+            step['rank'] = rank_name
+        if guild.me.top_role > member.top_role:
+            if guild.get_role(role_id) and user_roles & rank_ids != {role_id}:
+                step['role'] = role_id
+            nick = _rank_nickname(member, rank_abbr, rec['name'])
+            if nick != (member.nick or member.display_name):
+                step['nick'] = nick
+        if step.keys() & {'bump', 'rank', 'role', 'nick'} or step['regiment'] != (rec.get('regiment') or None):
+            plan.append(step)
+    return plan
+
+def _describe_sync_step(step):
+    parts = []
+    if 'bump' in step:
+        parts.append(f"merits → {step['bump']}")
+    if 'rank' in step:
+        parts.append(f"Rank cell → {step['rank']}")
+    if 'role' in step:
+        parts.append("rank role")
+    if 'nick' in step:
+        parts.append(f"nick → {step['nick']}")
+    return f"{step['name']}: " + (", ".join(parts) or "regiment")
+
+async def _apply_sync_step(guild, step, rank_cells, counts):
+    rec = roster_cache.get(step['name'])
+    if rec is None:
+        return  # purged since planning
+    if roster_cache.set_regiment(rec, step['regiment']):
+        merit_store.save(rec)
+    if 'bump' in step:
+        # merit bumps go through the journal like any other award; an award
+        # since planning may already have lifted them past the threshold
+        async with _member_lock(rec['name']):
+            if rec['merits'] < step['bump']:
+                await _write_merits(rec['name'], step['bump'], step['rank_name'])
+                counts['bumps'] += 1
+    elif 'rank' in step:
+        # the row is looked up when the chunk is flushed; rows can move
+        # while the member edits below are awaited
+        rank_cells[rec['name']] = step['rank']
+        roster_cache.update(rec, rank=step['rank'])
+        merit_store.save(rec)
+        counts['ranks'] += 1
+    member = guild.get_member(step['member_id'])
+    changes = _rank_edit(member, step.get('role'), step.get('nick')) if member else None
+    if changes:
+        try:
+            await member.edit(**changes)
+            counts['members'] += 1
+        except discord.HTTPException:
+            counts['failed'] += 1
+
 @bot.command()
 @commands.has_any_role(*HOST_ROLES)
-async def sync(ctx):
-    """Sync sheet merits with Discord roles; update 'Rank' column accordingly."""
+async def sync(ctx, *flags):
+    """Sync sheet merits with Discord roles; update 'Rank' column accordingly.
+    `!sync --dry-run` only shows what would change; `!sync --restart` ignores
+    the checkpoint of an unfinished sync."""
+    dry_run = '--dry-run' in flags
     try:
-        name_col, merit_col, rank_col, data_start = _locate_headers(force=True)
-        rows = main_sheet.get_all_values()[data_start:]
-        for i, row_vals in enumerate(rows, start=data_start):
-            username = (row_vals[name_col-1] if len(row_vals) >= name_col else "").strip()
-            if not username:
-                continue
-            member = next((m for m in ctx.guild.members if extract_roblox_name(m.display_name).lower() == username.lower()), None)
-            if not member:
-                continue
-            try:
-                current = int((row_vals[merit_col-1] if len(row_vals) >= merit_col else "0") or 0)
-            except Exception:
-                current = 0
-            # ensure merits honor existing rank roles
-            user_roles = {r.id for r in member.roles}
-            existing_threshold = next((thr for thr, _, _, rid in RANKS if rid in user_roles), 0)
-            if current < existing_threshold:
-                current = existing_threshold
-                main_sheet.update_cell(i, merit_col, current)
-            threshold, rank_name, rank_abbr, role_id = _get_rank_for_points(current)
-            main_sheet.update_cell(i, rank_col, rank_name)
-        await ctx.send("sync complete")
+        # the full reload checks the cached header map against the header row
+        records = list(await _reload_roster())
+        done = {} if '--restart' in flags else _load_sync_checkpoint()
+        plan = _plan_sync(ctx.guild, records, done)
+    except Exception as e:
+        return await ctx.send(f"Sync failed: {e}")
+
+    if dry_run:
+        lines = [_describe_sync_step(step) for step in plan]
+        summary = f"sync dry run: {len(plan)} member(s) would change" + (f" ({len(done)} skipped, already done)" if done else "")
+        text = "\n".join(lines)
+        if len(summary) + len(text) < 1900:
+            return await ctx.send(f"{summary}\n```\n{text}\n```" if lines else summary)
+        return await ctx.send(summary, file=discord.File(io.BytesIO(text.encode()), filename="sync_plan.txt"))
+
+    resumed = f" (resuming, {len(done)} already done)" if done else ""
+    status = await ctx.send(f"sync: {len(plan)} member(s) to update{resumed}...")
+    counts = {'bumps': 0, 'ranks': 0, 'members': 0, 'failed': 0}
+    requests_made = 0
+    try:
+        for i in range(0, len(plan), SYNC_BATCH_SIZE):
+            chunk = plan[i:i + SYNC_BATCH_SIZE]
+            rank_cells = {}
+            for step in chunk:
+                await _apply_sync_step(ctx.guild, step, rank_cells, counts)
+            # rows only move under the flush lock (purge, merge, reloads)
+            async with _journal_flush_lock:
+                batch = SheetWriteBatch(main_sheet)
+                for name, rank in rank_cells.items():
+                    rec = roster_cache.get(name)
+                    if rec is not None and rec['row'] is not None:
+                        batch.set(rec['row'], 'rank', rank)
+                requests_made += await batch.flush()
+            for step in chunk:
+                rec = roster_cache.get(step['name'])
+                if rec is not None:
+                    done[step['key']] = rec['merits']
+            merit_store.set_meta('sync_checkpoint', json.dumps({'at': time.time(), 'done': done}))
+            await status.edit(content=f"sync: {min(i + SYNC_BATCH_SIZE, len(plan))}/{len(plan)} member(s) updated{resumed}...")
+        bumped = await _flush_merit_journal()
     except Exception as e:
-        await ctx.send(f"Sync failed: {e}")
+        return await status.edit(content=f"Sync stopped: {e} — run !sync again to resume.")
+    merit_store.set_meta('sync_checkpoint', "null")
+    await status.edit(content=(
+        f"sync complete: {len(plan)} member(s) planned, {counts['bumps']} merit bump(s), "
+        f"{counts['ranks']} Rank cell(s), {counts['members']} role/nick update(s)"
+        + (f", {counts['failed']} failed" if counts['failed'] else "")
+        + f" ({requests_made} rank write request(s), {bumped} merit change(s) saved)"
+    ))
+
 @bot.command(name='enlist')
 @is_authorized()
 async def enlist(ctx, *, member_input=None):
@@ -652,19 +2257,8 @@ async def enlist(ctx, *, member_input=None):
         await ctx.send(embed=embed)
         return
 
-    guild = ctx.guild
-    member = None
-    # accept mention, id, name, or display_name
-    if member_input.startswith('<@') and member_input.endswith('>'):
-        member_id = member_input[2:-1].lstrip('!')
-        try:
-            member = guild.get_member(int(member_id))
-        except Exception:
-            member = None
-    elif member_input.isdigit():
-        member = guild.get_member(int(member_input))
-    else:
-        member = discord.utils.get(guild.members, name=member_input) or discord.utils.get(guild.members, display_name=member_input)
+    # accept mention, id, name, display_name or Roblox name
+    member = await resolve_member(ctx, member_input)
 
     if not member:
         return await ctx.send("❌ Member not found.")
@@ -691,6 +2285,17 @@ async def cancel_enlistment(ctx):
     else:
         await ctx.send("You don't have any active enlistment session.")
 
+_background_tasks = {}
+
+@bot.event
+async def on_ready():
+    print(f'{bot.user} is online!')
+    # on_ready fires again after reconnects; only start the loops once
+    if 'merit_journal' not in _background_tasks:
+        _background_tasks['merit_journal'] = asyncio.create_task(_merit_journal_flusher())
+    if 'roster_watch' not in _background_tasks:
+        _background_tasks['roster_watch'] = asyncio.create_task(_roster_change_poller())
+
 # Handle recruit free-text input (Roblox username)
 @bot.event
 async def on_message(message):
@@ -783,6 +2388,8 @@ async def forceadd(ctx, *args):
     - `!forceadd 10 target1 target2 @user 123456` (points first)
     - `!forceadd target1 target2 10` (points last)
     Targets may be Roblox usernames, Discord mentions, or numeric Discord IDs.
+    A name that isn't on the roster but looks like one that is gets a
+    "did you mean" instead; prefix it with `+` to add it as a new row.
     """
     if not args:
         return await ctx.send("Usage: provide points and at least one target.")
@@ -805,19 +2412,10 @@ async def forceadd(ctx, *args):
     results = []
     for t in targets:
         t = str(t).strip()
-        member = None
-        # mention form or id
-        if t.startswith('<@') and t.endswith('>'):
-            try:
-                member_id = int(t.strip('<@!>'))
-                member = ctx.guild.get_member(member_id)
-            except:
-                member = None
-        elif t.isdigit():
-            member = ctx.guild.get_member(int(t))
-        else:
-            # try find by exact name/display
-            member = discord.utils.get(ctx.guild.members, name=t) or discord.utils.get(ctx.guild.members, display_name=t)
+        force_new = t.startswith('+') and len(t) > 1
+        if force_new:
+            t = t[1:]
+        member = await resolve_member(ctx, t)
 
         if member:
             roblox_name = extract_roblox_name(member.display_name)
@@ -825,14 +2423,21 @@ async def forceadd(ctx, *args):
             roblox_name = t  # treat as raw roblox username
 
         try:
-            rec = _find_record(roblox_name)
-            if rec:
-                total = rec['merits'] + points
-                _set_merits_by_row(rec['row'], total)
-                results.append(f"✅ {roblox_name}: now {total}")
-            else:
-                _append_user(roblox_name, points)
-                results.append(f"➕ {roblox_name}: added with {points}")
+            async with _member_lock(roblox_name):
+                rec = await _find_record(roblox_name)
+                if rec:
+                    total = rec['merits'] + points
+                    rec = await _write_merits(rec['name'], total)
+                    results.append(f"✅ {roblox_name}: now {total}")
+                else:
+                    close = [] if force_new else roster_cache.search.suggest(roblox_name)
+                    if close:
+                        names = ", ".join(f"`{name}`" for name, _ in close)
+                        results.append(f"❓ {roblox_name}: not on the roster. Did you mean {names}? Use `+{roblox_name}` to add it as new.")
+                        continue
+                    rec = await _write_merits(roblox_name, points)
+                    results.append(f"➕ {roblox_name}: added with {points}")
+                _record_award(rec, points, member)
         except Exception as e:
             results.append(f"❌ {roblox_name}: error {e}")
 
@@ -849,17 +2454,7 @@ async def resetmerit(ctx, *targets):
     results = []
     for t in targets:
         t = str(t).strip()
-        member = None
-        if t.startswith('<@') and t.endswith('>'):
-            try:
-                member_id = int(t.strip('<@!>'))
-                member = ctx.guild.get_member(member_id)
-            except:
-                member = None
-        elif t.isdigit():
-            member = ctx.guild.get_member(int(t))
-        else:
-            member = discord.utils.get(ctx.guild.members, name=t) or discord.utils.get(ctx.guild.members, display_name=t)
+        member = await resolve_member(ctx, t)
 
         if member:
             roblox_name = extract_roblox_name(member.display_name)
@@ -867,11 +2462,13 @@ async def resetmerit(ctx, *targets):
             roblox_name = t
 
         try:
-            rec = _find_record(roblox_name)
+            async with _member_lock(roblox_name):
+                rec = await _find_record(roblox_name)
+                if rec:
+                    await _write_merits(rec['name'], 0)
             if not rec:
                 results.append(f"❌ {roblox_name}: not found")
             else:
-                _set_merits_by_row(rec['row'], 0)
                 results.append(f"✅ {roblox_name}: reset to 0")
         except Exception as e:
             results.append(f"❌ {roblox_name}: error {e}")
@@ -886,19 +2483,10 @@ async def purgeuser(ctx, *targets):
     if not targets:
         return await ctx.send("Provide at least one username, mention, or ID.")
     results = []
+    doomed = []
     for t in targets:
         t = str(t).strip()
-        member = None
-        if t.startswith('<@') and t.endswith('>'):
-            try:
-                member_id = int(t.strip('<@!>'))
-                member = ctx.guild.get_member(member_id)
-            except:
-                member = None
-        elif t.isdigit():
-            member = ctx.guild.get_member(int(t))
-        else:
-            member = discord.utils.get(ctx.guild.members, name=t) or discord.utils.get(ctx.guild.members, display_name=t)
+        member = await resolve_member(ctx, t)
 
         if member:
             roblox_name = extract_roblox_name(member.display_name)
@@ -906,16 +2494,88 @@ async def purgeuser(ctx, *targets):
             roblox_name = t
 
         try:
-            rec = _find_record(roblox_name)
+            rec = await _find_record(roblox_name)
             if not rec:
                 results.append(f"❌ {roblox_name}: not found")
             else:
-                main_sheet.delete_rows(rec['row'])
+                if not any(r is rec for r in doomed):
+                    doomed.append(rec)
                 results.append(f"🗑️ {roblox_name}: removed")
         except Exception as e:
             results.append(f"❌ {roblox_name}: error {e}")
+    try:
+        # the flusher holds row numbers between building and sending a batch
+        async with _journal_flush_lock:
+            await _delete_user_rows([rec['row'] for rec in doomed])
+            # queued changes would bring purged members back on the next reload
+            merit_journal.drop({_name_key(rec['name']) for rec in doomed})
+            for rec in doomed:
+                if rec['row'] is None:
+                    roster_cache.discard(rec)
+                    merit_store.delete(rec)
+    except Exception as e:
+        results = [f"❌ purge failed: {e}"]
     await ctx.send("\\n".join(results))
 
+@bot.command()
+@commands.is_owner()
+async def mergedupes(ctx, *flags):
+    """Merge roster rows holding the same Roblox name (by canonical key).
+    The topmost row keeps the highest total among them and the matching
+    rank; the others are deleted, all in one spreadsheet batch_update.
+    Totals aren't summed: a duplicate row starts from the member's rank
+    threshold, so it already holds most of the original total.
+    `!mergedupes --dry-run` only lists what would be merged."""
+    dry_run = '--dry-run' in flags
+    try:
+        # the sheet must hold every journaled change before rows go away
+        await _flush_merit_journal()
+        await _get_all_records()
+        name_col, merit_col, rank_col, data_start = await _locate_headers()
+    except Exception as e:
+        return await ctx.send(f"❌ Failed to load data: {e}")
+
+    async with _journal_flush_lock:
+        groups = defaultdict(list)
+        for rec in roster_cache.records:
+            if rec['row'] is not None:
+                groups[_name_key(rec['name'])].append(rec)
+        merges = []
+        for group in groups.values():
+            if len(group) > 1:
+                group.sort(key=lambda rec: rec['row'])
+                total = max(rec['merits'] for rec in group)
+                merges.append((group[0], group[1:], total, _get_rank_for_points(total)[1]))
+        if not merges:
+            return await ctx.send("No duplicate rows found.")
+        if dry_run:
+            text = "\n".join(
+                f"{keep['name']} (row {keep['row']}): highest of {', '.join(str(r['merits']) for r in [keep, *extra])} = {total}, "
+                f"removing row(s) {', '.join(str(r['row']) for r in extra)}"
+                for keep, extra, total, rank_name in merges
+            )
+            return await ctx.send(f"{len(merges)} duplicate name(s) would be merged, keeping the highest total:\n```\n{text[:1800]}\n```")
+
+        # cell updates use the original row numbers, so they go before the deletes
+        requests = []
+        for keep, extra, total, rank_name in merges:
+            requests.append(_update_cell_request(keep['row'], merit_col, total))
+            requests.append(_update_cell_request(keep['row'], rank_col, rank_name))
+        doomed = [rec['row'] for _, extra, _, _ in merges for rec in extra]
+        requests.extend(_delete_row_requests(doomed))
+        try:
+            async with _sheet_layout_lock:
+                await sheets.write(main_sheet.spreadsheet.batch_update, {'requests': requests}, idempotent=False)
+                for keep, extra, total, rank_name in merges:
+                    roster_cache.update(keep, total, rank_name)
+                    merit_store.save(keep)
+                roster_cache.delete_rows(doomed)
+                merit_store.delete_rows(doomed, roster_cache.last_row)
+        except Exception as e:
+            roster_cache.invalidate()
+            return await ctx.send(f"❌ Merge failed: {e}")
+    await ctx.send(f"🧹 Merged {len(merges)} duplicate name(s), removed {len(doomed)} row(s).")
+
 @bot.command(name='cheesecake')
 async def cheesecake_command(ctx):
     """Show the role management interface"""
@@ -1192,77 +2852,39 @@ def get_rank_index(member: discord.Member):
             return i
     return None
 
-async def cleanup_roles(member: discord.Member, keep_role_id: int):
-    for rank in ranks:
-        if rank["role"] != keep_role_id:
-            role = discord.utils.get(member.roles, id=rank["role"])
-            if role:
-                await member.remove_roles(role)
-
-async def update_nickname(member: discord.Member, new_rank: str):
+async def apply_officer_rank(member: discord.Member, new_rank: dict):
     """
-    robust nickname updater:
-    preserves optional [𝓡𝓛] prefix, optional {REGIMENT}, and username after '|'
-    if regiment missing, inserts {UNK}
-    returns True on success, False on failure (permission/error)
+    give the member new_rank's role (dropping the other officer ranks), the
+    extra roles and the matching nickname in one member edit; no request is
+    made when nothing changes. if the nickname can't be set (e.g. the guild
+    owner) the roles are still applied on their own
+    returns (roles_ok, nick_ok)
     """
+    changes = _plan_member_edit(
+        member,
+        remove=[rank["role"] for rank in ranks],
+        add=[new_rank["role"], *extra_roles],
+        nick=_rank_nickname(member, new_rank["nick"].upper()),
+    )
+    if not changes:
+        return True, True
     try:
-        raw = (member.nick or member.display_name or "").strip()
+        await member.edit(**changes)
+        return True, True
+    except discord.Forbidden:
+        if 'nick' not in changes:
+            return False, True
     except Exception:
-        raw = ""
-
-    rl_prefix = ""
-    regiment_part = None
-    username_part = None
-
-    if '|' in raw:
-        left, right = raw.split('|', 1)
-        left = left.strip()
-        username_part = right.strip()
-
-        # detect [𝓡𝓛] prefix (allow no space or a space)
-        m_rl = re.match(r'^\[𝓡𝓛\]\s*(.*)$', left)
-        if m_rl:
-            rl_prefix = "[𝓡𝓛] "
-            left = m_rl.group(1).strip()
-
-        # detect {REGIMENT} if present
-        m_reg = re.match(r'^(\{.*?\})\s*(.*)$', left)
-        if m_reg:
-            regiment_part = m_reg.group(1)
-            # left_after_reg = m_reg.group(2).strip()  # old rank text, unused
-    else:
-        # no '|' present, attempt to salvage
-        tmp = raw
-        m_rl = re.match(r'^\[𝓡𝓛\]\s*(.*)$', tmp)
-        if m_rl:
-            rl_prefix = "[𝓡𝓛] "
-            tmp = m_rl.group(1).strip()
-
-        m_reg = re.match(r'^(\{.*?\})\s*(.*)$', tmp)
-        if m_reg:
-            regiment_part = m_reg.group(1)
-            username_part = m_reg.group(2).strip() or None
-        else:
-            username_part = tmp or None
-
-    if not username_part:
-        username_part = member.display_name or member.name or "unknown"
-
-    if not regiment_part:
-        regiment_part = "{UNK}"
-
-    new_rank_up = new_rank.upper()
-    new_nick = f"{rl_prefix}{regiment_part} {new_rank_up} | {username_part}"
-    new_nick = new_nick[:32]
-
+        return False, False
+    # retry without the nickname so its failure doesn't cancel the rank change
+    changes.pop('nick')
+    if not changes:
+        return True, False
     try:
-        await member.edit(nick=new_nick)
-        return True
-    except discord.Forbidden:
-        return False
+        await member.edit(**changes)
+        return True, False
     except Exception:
-        return False
+        return False, False
 
 async def log_action(ctx, member: discord.Member, action: str, old_rank: str, new_rank: str):
     log_channel = ctx.guild.get_channel(log_channel_id)
@@ -1290,18 +2912,12 @@ async def officer_promote(ctx, member: discord.Member):
         await log_action(ctx, member, "promoted (attempted - hierarchy)", old_rank["nick"], new_rank["nick"])
         return
 
-    # remove other rank roles, give new rank
-    await cleanup_roles(member, new_rank["role"])
-    await member.add_roles(discord.Object(id=new_rank["role"]))
-
-    # ensure extra roles present
-    for role_id in extra_roles:
-        if not discord.utils.get(member.roles, id=role_id):
-            await member.add_roles(discord.Object(id=role_id))
-
-    # update nickname using robust updater
-    success = await update_nickname(member, new_rank["nick"])
-    if not success:
+    # swap rank roles, ensure extra roles and update nickname in one edit
+    roles_ok, nick_ok = await apply_officer_rank(member, new_rank)
+    if not roles_ok:
+        await ctx.send(f"could not change roles for {member.mention}")
+        return
+    if not nick_ok:
         await ctx.send(f"could not change nickname for {member.mention}")
 
     await ctx.send(f"{member.mention} promoted to {new_rank['nick']}")
@@ -1327,18 +2943,12 @@ async def officer_demote(ctx, member: discord.Member):
         await log_action(ctx, member, "demoted (attempted - hierarchy)", old_rank["nick"], new_rank["nick"])
         return
 
-    # remove other rank roles, give new rank
-    await cleanup_roles(member, new_rank["role"])
-    await member.add_roles(discord.Object(id=new_rank["role"]))
-
-    # ensure extra roles present
-    for role_id in extra_roles:
-        if not discord.utils.get(member.roles, id=role_id):
-            await member.add_roles(discord.Object(id=role_id))
-
-    # update nickname using robust updater
-    success = await update_nickname(member, new_rank["nick"])
-    if not success:
+    # swap rank roles, ensure extra roles and update nickname in one edit
+    roles_ok, nick_ok = await apply_officer_rank(member, new_rank)
+    if not roles_ok:
+        await ctx.send(f"could not change roles for {member.mention}")
+        return
+    if not nick_ok:
         await ctx.send(f"could not change nickname for {member.mention}")
 
     await ctx.send(f"{member.mention} demoted to {new_rank['nick']}")
@@ -1368,14 +2978,54 @@ async def debug(ctx):
     latency = round(bot.latency * 1000)  # in milliseconds
     guilds = len(bot.guilds)
     members = sum(guild.member_count for guild in bot.guilds)
+    cache = roster_cache.stats()
+    pending = len(merit_journal.pending)
+    quota = sheets.quota()
     await ctx.send(
         f"Bot is online ✅\n"
         f"Latency: {latency}ms\n"
         f"Connected servers: {guilds}\n"
-        f"Total members: {members}"
+        f"Total members: {members}\n"
+        f"Roster cache: {cache['hits']} hits / {cache['misses']} misses "
+        f"({cache['hit_rate']:.0%}), {cache['size']} records, version {roster_cache.version}\n"
+        f"Merit journal: {pending} change(s) waiting for the sheet\n"
+        f"Sheets quota left: {quota['read']} reads / {quota['write']} writes this minute "
+        f"({quota['read_waiting'] + quota['write_waiting']} queued, {quota['retries']} retries, {quota['throttled']} × 429)"
     )
 
 
+@bot.command()
+@commands.is_owner()
+async def rosterbench(ctx):
+    """Compare a full-sheet roster read with the three-column batch_get."""
+    name_col, merit_col, rank_col, data_start = await _locate_headers()
+
+    start = time.perf_counter()
+    rows = await sheets.read(main_sheet.get_all_values)
+    full_fetch = time.perf_counter() - start
+    start = time.perf_counter()
+    full_count = 0
+    for r in rows[data_start-1:]:
+        if (r[name_col-1] if len(r) >= name_col else "").strip():
+            _parse_merits(r[merit_col-1] if len(r) >= merit_col else "0")
+            full_count += 1
+    full_parse = time.perf_counter() - start
+    full_bytes = len(json.dumps(rows).encode())
+
+    start = time.perf_counter()
+    data_start, names, merits, ranks = await _fetch_roster_columns()
+    cols_fetch = time.perf_counter() - start
+    start = time.perf_counter()
+    sheet_rows, _ = _roster_rows(data_start, names, merits, ranks)
+    cols_parse = time.perf_counter() - start
+    cols_bytes = len(json.dumps([names, merits, ranks]).encode())
+
+    await ctx.send(
+        f"get_all_values: {full_bytes:,} bytes, fetch {full_fetch*1000:.0f}ms, parse {full_parse*1000:.2f}ms ({full_count} rows)\n"
+        f"batch_get columns: {cols_bytes:,} bytes, fetch {cols_fetch*1000:.0f}ms, parse {cols_parse*1000:.2f}ms ({len(sheet_rows)} rows)\n"
+        f"payload {cols_bytes / max(full_bytes, 1):.0%} of the full read"
+    )
+
 SERVER_A = 1409059947530031157
 SERVER_B = 1122152849833459842
 ROLE_ID = 1339571735028174919
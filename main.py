@@ -6,6 +6,7 @@ import discord
 from discord.ext import commands
 import gspread
 import gspread.exceptions as gspread_exceptions
+from gspread.utils import rowcol_to_a1
 from dotenv import load_dotenv
 from oauth2client.service_account import ServiceAccountCredentials
 from datetime import datetime
@@ -25,6 +26,8 @@ import textwrap
 import traceback
 import contextlib
 import difflib
+import functools
+import unicodedata
 
 # ----------------- Flask for uptime -----------------
 app = Flask("")
@@ -148,6 +151,51 @@ scope = [
 creds = ServiceAccountCredentials.from_json_keyfile_dict(creds_dict, scope)
 client = gspread.authorize(creds)
 main_sheet = client.open("__1ST VANGUARD DIVISION MERIT DATA__").sheet1
+
+# --- Header map ---
+# Where the Name / Merits / Rank headers sit. Saved to a JSON file so a
+# restart doesn't search the sheet again; readers check the header cells
+# their column read returns and only search again when those moved.
+HEADER_CACHE_PATH = os.getenv("HEADER_CACHE_PATH", "sheet_headers.json")
+HEADER_LABELS = ("Name", "Merits", "Rank")
+_HEADER_CACHE = {}
+try:
+    with open(HEADER_CACHE_PATH) as f:
+        _HEADER_CACHE.update(json.load(f))
+except (OSError, ValueError):
+    pass
+
+def _locate_headers(sheet, force=False):
+    """Return (name_col, merit_col, rank_col, data_start_row), searching the sheet only when forced."""
+    if _HEADER_CACHE and not force:
+        return _HEADER_CACHE['name_col'], _HEADER_CACHE['merit_col'], _HEADER_CACHE['rank_col'], _HEADER_CACHE['data_start_row']
+    cells = [sheet.find(label) for label in HEADER_LABELS]
+    if not all(cells):
+        raise RuntimeError("Missing sheet headers (Name, Merits, Rank).")
+    name_cell, merit_cell, rank_cell = cells
+    _HEADER_CACHE.update({
+        'name_col': name_cell.col, 'merit_col': merit_cell.col,
+        'rank_col': rank_cell.col, 'data_start_row': name_cell.row + 1,
+    })
+    with open(HEADER_CACHE_PATH, "w") as f:
+        json.dump(_HEADER_CACHE, f)
+    return name_cell.col, merit_cell.col, rank_cell.col, name_cell.row + 1
+
+def _read_roster_columns(sheet):
+    """Read the Name/Merits/Rank columns from the header row down in one request.
+    Returns (name_col, merit_col, rank_col, data_start_row, names, merits, ranks)."""
+    for attempt in range(2):
+        name_col, merit_col, rank_col, data_start_row = _locate_headers(sheet, force=attempt > 0)
+        ranges = []
+        for col in (name_col, merit_col, rank_col):
+            first = rowcol_to_a1(data_start_row - 1, col)
+            ranges.append(f"{first}:{first.rstrip('0123456789')}")
+        columns = [[c[0] if c else "" for c in col] for col in sheet.batch_get(ranges)]
+        if tuple((col[0] if col else "").strip() for col in columns) == HEADER_LABELS:
+            names, merits, ranks = (col[1:] for col in columns)
+            return name_col, merit_col, rank_col, data_start_row, names, merits, ranks
+    raise RuntimeError("Missing sheet headers (Name, Merits, Rank).")
+
 # Role IDs for regiments
 REGIMENT_ROLES = {
     1320153442244886598: "LL",
@@ -177,6 +225,12 @@ RANKS = [
     (700, "Master Sergeant", "MSGT",  1214438714508312596)
 ]
 
+@functools.lru_cache(maxsize=8192)
+def _name_key(name: str) -> str:
+    """Canonical form of a Roblox name for matching: NFKC, case-folded,
+    whitespace collapsed. Cached, so each distinct name is normalized once."""
+    return " ".join(unicodedata.normalize("NFKC", name).casefold().split())
+
 def extract_roblox_name(nickname: str) -> str:
     return nickname.split()[-1] if nickname else "Unknown"
 
@@ -295,29 +349,18 @@ async def _process_award(ctx: commands.Context, member: discord.Member, points:
 
     sheet = main_sheet if info.get("sheet_type") == "main" else main_sheet
 
-    # Find headers on sheet
+    # Read existing names and merits under the cached headers
     try:
-        name_cell = sheet.find("Name")
-        merit_cell = sheet.find("Merits")
-        rank_cell = sheet.find("Rank")
-    except gspread_exceptions.CellNotFound:
+        name_col, merit_col, rank_col, data_start_row, existing_names, merit_values, _ = _read_roster_columns(sheet)
+    except RuntimeError:
         return f"{roblox_username}: Missing sheet headers (Name, Merits, Rank)."
 
-    if not (name_cell and merit_cell and rank_cell):
-        return f"{roblox_username}: Could not locate headers."
-
-    name_col, merit_col, rank_col = name_cell.col, merit_cell.col, rank_cell.col
-    data_start_row = name_cell.row + 1
-
-    # Read existing names under header
-    existing_names = sheet.col_values(name_col)[data_start_row - 1 :]
-
     # find current merits
     row = None
     try:
-        idx = existing_names.index(roblox_username)
+        idx = [_name_key(n) for n in existing_names].index(_name_key(roblox_username))
         row = data_start_row + idx
-        current_merits = int(sheet.cell(row, merit_col).value or 0)
+        current_merits = int((merit_values[idx] if idx < len(merit_values) else "") or 0)
     except ValueError:
         # Not in DB: use their current Discord role baseline from RANKS
         member_role_ids = {r.id for r in member.roles}
@@ -342,7 +385,8 @@ async def _process_award(ctx: commands.Context, member: discord.Member, points:
                 break
         if insert_row is None:
             insert_row = data_start_row + len(existing_names)
-        sheet.insert_row([roblox_username, new_total, new_rank_name], index=insert_row)
+        by_col = {name_col: roblox_username, merit_col: new_total, rank_col: new_rank_name}
+        sheet.insert_row([by_col.get(c, "") for c in range(1, max(by_col) + 1)], index=insert_row)
     else:
         sheet.update_cell(row, merit_col, new_total)
         sheet.update_cell(row, rank_col, new_rank_name)
@@ -449,7 +493,7 @@ async def mypoints(ctx):
     for sheet in [main_sheet]:
         data = sheet.get_all_values()
         for row in data:
-            if len(row) >= 2 and row[0].strip().lower() == roblox_name.lower():
+            if len(row) >= 2 and _name_key(row[0]) == _name_key(roblox_name):
                 total = int(row[1])
                 embed = discord.Embed(title="📊 Your Points", color=discord.Color.blue())
                 embed.add_field(name="Roblox Username", value=roblox_name)
@@ -470,7 +514,7 @@ async def pointsneeded(ctx):
     for sheet in [main_sheet]:
         data = sheet.get_all_values()
         for row in data:
-            if len(row) >= 2 and row[0].strip().lower() == roblox_name.lower():
+            if len(row) >= 2 and _name_key(row[0]) == _name_key(roblox_name):
                 points = int(row[1])
                 for threshold, name, abbr, _ in RANKS:
                     if points < threshold:
@@ -503,7 +547,7 @@ async def promote(ctx, *targets):
         for sheet in [main_sheet]:
             data = sheet.get_all_values()
             for row in data:
-                if len(row) >= 2 and row[0].strip().lower() == roblox_name.lower():
+                if len(row) >= 2 and _name_key(row[0]) == _name_key(roblox_name):
                     total = int(row[1])
                     break
             if total is not None:
@@ -541,7 +585,7 @@ async def selfpromote(ctx):
     for sheet in [main_sheet]:
         data = sheet.get_all_values()
         for row in data:
-            if len(row) >= 2 and row[0].strip().lower() == roblox_name.lower():
+            if len(row) >= 2 and _name_key(row[0]) == _name_key(roblox_name):
                 total = int(row[1])
                 break
         if total is not None:
@@ -575,17 +619,16 @@ async def selfpromote(ctx):
 @commands.has_any_role(*HOST_ROLES)
 async def sync(ctx):
     for sheet in [main_sheet]:
-        # find the headers anywhere
+        # cached header map, re-discovered only if the names' header cell moved
         try:
-            name_cell  = sheet.find("Name")
-            merit_cell = sheet.find("Merits")
-            rank_cell  = sheet.find("Rank")
-        except CellNotFound:
+            name_col, merit_col, rank_col, data_start = _locate_headers(sheet)
+            values = sheet.get_all_values()
+            header = values[data_start-2] if 2 <= data_start <= len(values) + 1 else []
+            if tuple((header[c-1] if len(header) >= c else "").strip() for c in (name_col, merit_col, rank_col)) != HEADER_LABELS:
+                name_col, merit_col, rank_col, data_start = _locate_headers(sheet, force=True)
+        except RuntimeError:
             continue
-
-        name_col, merit_col, rank_col = name_cell.col, merit_cell.col, rank_cell.col
-        data_start = name_cell.row + 1
-        rows = sheet.get_all_values()[data_start:]
+        rows = values[data_start-1:]
 
         for i, row_vals in enumerate(rows, start=data_start):
             username = row_vals[name_col-1].strip()
@@ -595,7 +638,7 @@ async def sync(ctx):
             # match member by roblox username (case-insensitive)
             member = next(
                 (m for m in ctx.guild.members
-                 if extract_roblox_name(m.display_name).lower() == username.lower()),
+                 if _name_key(extract_roblox_name(m.display_name)) == _name_key(username)),
                 None
             )
             if not member:
@@ -651,7 +694,7 @@ async def forceadd(ctx, roblox_name: str, points: int):
     for sheet in [main_sheet]:
         data = sheet.get_all_values()
         for i, row in enumerate(data):
-            if row and row[0].strip().lower() == roblox_name.lower():
+            if row and _name_key(row[0]) == _name_key(roblox_name):
                 current_merits = extract_number(row[1])
                 total = current_merits + points
                 sheet.update_cell(i + 1, 2, total)
@@ -667,7 +710,7 @@ async def resetmerit(ctx, roblox_name: str):
     for sheet in [main_sheet]:
         data = sheet.get_all_values()
         for i, row in enumerate(data):
-            if row and row[0].strip().lower() == roblox_name.lower():
+            if row and _name_key(row[0]) == _name_key(roblox_name):
                 sheet.update_cell(i + 1, 2, 0)
                 return await ctx.send(f"{roblox_name}'s merits have been reset to 0.")
     await ctx.send(f"{roblox_name} not found in any sheet.")
@@ -679,7 +722,7 @@ async def purgeuser(ctx, roblox_name: str):
     for sheet in [main_sheet]:
         data = sheet.get_all_values()
         for i, row in enumerate(data):
-            if row and row[0].strip().lower() == roblox_name.lower():
+            if row and _name_key(row[0]) == _name_key(roblox_name):
                 sheet.delete_rows(i + 1)
                 return await ctx.send(f"{roblox_name} has been removed from the sheet.")
     await ctx.send(f"{roblox_name} not found in any sheet.")